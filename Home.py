@@ -1,8 +1,13 @@
 import streamlit as st
 import os
+from utils.catalog import Catalog
 
 st.set_page_config(page_title="Home", layout="wide")
 
+@st.cache_resource
+def get_catalog():
+    return Catalog()
+
 st.title("📡 Infrared Object Detection - Home")
 
 if st.button("➕ Create New Project"):
@@ -13,11 +18,25 @@ st.markdown("---")
 # Show existing projects
 project_dir = "projects"
 os.makedirs(project_dir, exist_ok=True)
-projects = os.listdir(project_dir)
+projects = sorted(
+    p for p in os.listdir(project_dir)
+    if not p.startswith('.') and os.path.isdir(os.path.join(project_dir, p))
+)
+
+# Projects created before the catalog existed are scanned once, then read from it
+catalog = get_catalog()
+for project in projects:
+    if not catalog.has_project(project):
+        catalog.sync_project(project, project_dir)
+summaries = {s['name']: s for s in catalog.project_summaries()}
 
 st.subheader("📂 Existing Projects")
 if not projects:
     st.write("No projects yet.")
 else:
     for project in projects:
-        st.write(f"- {project}")
+        summary = summaries[project]
+        images, labeled = summary['image_count'], summary['labeled_count']
+        st.write(f"- **{project}** — {labeled} / {images} image(s) labeled · last activity {summary['last_activity'][:16]}")
+        if images:
+            st.progress(labeled / images)
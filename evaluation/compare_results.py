@@ -0,0 +1,224 @@
+import os
+import sys
+import json
+import argparse
+from multiprocessing import Pool
+import numpy as np
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.box_ops import box_iou, xywh_to_xyxy
+
+# IoU thresholds for mAP50-95 (COCO style)
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+# Confusion matrix settings, same defaults as ultralytics validation
+CM_CONF = 0.25
+CM_IOU = 0.45
+
+
+# Read a label file into an (N, 6) array [class, x, y, w, h, conf].
+# Ground-truth files have no confidence column; those rows get 1.0.
+def read_labels(label_path):
+    rows = []
+    if os.path.exists(label_path):
+        with open(label_path, 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 5:
+                    values = [float(v) for v in parts[:6]]
+                    rows.append(values if len(values) == 6 else values + [1.0])
+    return np.array(rows, dtype=np.float32).reshape(-1, 6)
+
+
+# Mark which predictions are true positives at each IoU threshold: (P, T) bool
+def match_predictions(gt, pred, iou):
+    correct = np.zeros((len(pred), len(IOU_THRESHOLDS)), dtype=bool)
+    if len(gt) == 0 or len(pred) == 0:
+        return correct
+    iou = np.where(gt[:, None, 0] == pred[None, :, 0], iou, 0.0)
+    for t, threshold in enumerate(IOU_THRESHOLDS):
+        gt_idx, pred_idx = np.nonzero(iou >= threshold)
+        if len(gt_idx) == 0:
+            continue
+        matches = np.stack([gt_idx, pred_idx], axis=1)
+        matches = matches[np.argsort(-iou[gt_idx, pred_idx], kind='stable')]
+        # Greedy one-to-one: each prediction and each GT object used at most once
+        matches = matches[np.unique(matches[:, 1], return_index=True)[1]]
+        matches = matches[np.unique(matches[:, 0], return_index=True)[1]]
+        correct[matches[:, 1], t] = True
+    return correct
+
+
+# Rows are predicted class, columns true class; index nc is background
+def update_confusion_matrix(matrix, gt, pred, iou, nc):
+    keep = pred[:, 5] > CM_CONF
+    pred, iou = pred[keep], iou[:, keep]
+    gt_cls = gt[:, 0].astype(int)
+    pred_cls = pred[:, 0].astype(int)
+    gt_idx, pred_idx = np.nonzero(iou > CM_IOU)
+    if len(gt_idx):
+        matches = np.stack([gt_idx, pred_idx], axis=1)
+        matches = matches[np.argsort(-iou[gt_idx, pred_idx], kind='stable')]
+        matches = matches[np.unique(matches[:, 1], return_index=True)[1]]
+        matches = matches[np.unique(matches[:, 0], return_index=True)[1]]
+    else:
+        matches = np.zeros((0, 2), dtype=int)
+    np.add.at(matrix, (pred_cls[matches[:, 1]], gt_cls[matches[:, 0]]), 1)
+    missed = np.ones(len(gt), dtype=bool)
+    missed[matches[:, 0]] = False
+    np.add.at(matrix, (np.full(missed.sum(), nc), gt_cls[missed]), 1)
+    unmatched = np.ones(len(pred), dtype=bool)
+    unmatched[matches[:, 1]] = False
+    np.add.at(matrix, (pred_cls[unmatched], np.full(unmatched.sum(), nc)), 1)
+
+
+# Worker: evaluate one shard of images and return the raw statistics
+def evaluate_shard(args):
+    stems, gt_dir, pred_dir, nc = args
+    correct, conf, pred_cls, target_cls = [], [], [], []
+    matrix = np.zeros((nc + 1, nc + 1), dtype=np.int64)
+    for stem in stems:
+        gt = read_labels(os.path.join(gt_dir, stem + '.txt'))
+        pred = read_labels(os.path.join(pred_dir, stem + '.txt'))
+        iou = box_iou(xywh_to_xyxy(gt[:, 1:5]), xywh_to_xyxy(pred[:, 1:5]))
+        correct.append(match_predictions(gt, pred, iou))
+        conf.append(pred[:, 5])
+        pred_cls.append(pred[:, 0])
+        target_cls.append(gt[:, 0])
+        update_confusion_matrix(matrix, gt, pred, iou, nc)
+    return (
+        np.concatenate(correct) if correct else np.zeros((0, len(IOU_THRESHOLDS)), dtype=bool),
+        np.concatenate(conf) if conf else np.zeros(0, dtype=np.float32),
+        np.concatenate(pred_cls) if pred_cls else np.zeros(0, dtype=np.float32),
+        np.concatenate(target_cls) if target_cls else np.zeros(0, dtype=np.float32),
+        matrix
+    )
+
+
+# Area under the precision envelope, 101-point interpolation (COCO)
+def compute_ap(recall, precision):
+    mrec = np.concatenate(([0.0], recall, [1.0]))
+    mpre = np.concatenate(([1.0], precision, [0.0]))
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))
+    x = np.linspace(0, 1, 101)
+    return np.trapz(np.interp(x, mrec, mpre), x)
+
+
+# Per-class AP at every IoU threshold, plus precision/recall at the max-F1 confidence
+def ap_per_class(correct, conf, pred_cls, target_cls, nc, eps=1e-16):
+    order = np.argsort(-conf, kind='stable')
+    correct, conf, pred_cls = correct[order], conf[order], pred_cls[order]
+    n_gt = np.bincount(target_cls.astype(int), minlength=nc)[:nc]
+    px = np.linspace(0, 1, 1000)
+    ap = np.zeros((nc, correct.shape[1]))
+    p_curve = np.zeros((nc, len(px)))
+    r_curve = np.zeros((nc, len(px)))
+    for c in range(nc):
+        i = pred_cls == c
+        if i.sum() == 0 or n_gt[c] == 0:
+            continue
+        tpc = correct[i].cumsum(0)
+        fpc = (1 - correct[i]).cumsum(0)
+        recall = tpc / (n_gt[c] + eps)
+        precision = tpc / (tpc + fpc)
+        # np.interp needs increasing x, confidences are sorted descending
+        r_curve[c] = np.interp(-px, -conf[i], recall[:, 0], left=0)
+        p_curve[c] = np.interp(-px, -conf[i], precision[:, 0], left=1)
+        for t in range(correct.shape[1]):
+            ap[c, t] = compute_ap(recall[:, t], precision[:, t])
+    f1 = 2 * p_curve * r_curve / (p_curve + r_curve + eps)
+    best = f1.mean(0).argmax()
+    return p_curve[:, best], r_curve[:, best], ap, n_gt
+
+
+def list_stems(*label_dirs):
+    stems = set()
+    for label_dir in label_dirs:
+        if os.path.isdir(label_dir):
+            stems.update(f[:-4] for f in os.listdir(label_dir) if f.endswith('.txt'))
+    return sorted(stems)
+
+
+# Compare a prediction label directory (with confidences) against ground truth,
+# optionally restricted to a subset of image stems
+def evaluate(gt_dir, pred_dir, names, workers=4, shard_size=64, stems=None):
+    nc = len(names)
+    stems = list_stems(gt_dir, pred_dir) if stems is None else sorted(stems)
+    shards = [(stems[i:i + shard_size], gt_dir, pred_dir, nc) for i in range(0, len(stems), shard_size)]
+    if workers > 1 and len(shards) > 1:
+        with Pool(workers) as pool:
+            parts = pool.map(evaluate_shard, shards)
+    else:
+        parts = [evaluate_shard(shard) for shard in shards]
+    if not parts:
+        parts = [evaluate_shard(([], gt_dir, pred_dir, nc))]
+
+    correct = np.concatenate([p[0] for p in parts])
+    conf = np.concatenate([p[1] for p in parts])
+    pred_cls = np.concatenate([p[2] for p in parts])
+    target_cls = np.concatenate([p[3] for p in parts])
+    matrix = sum(p[4] for p in parts)
+
+    precision, recall, ap, n_gt = ap_per_class(correct, conf, pred_cls, target_cls, nc)
+    present = n_gt > 0
+    per_class = {}
+    for c, name in enumerate(names):
+        per_class[name] = {
+            'instances': int(n_gt[c]),
+            'precision': float(precision[c]),
+            'recall': float(recall[c]),
+            'ap50': float(ap[c, 0]),
+            'ap50_95': float(ap[c].mean())
+        }
+    return {
+        'images': len(stems),
+        'instances': int(n_gt.sum()),
+        'precision': float(precision[present].mean()) if present.any() else 0.0,
+        'recall': float(recall[present].mean()) if present.any() else 0.0,
+        'map50': float(ap[present, 0].mean()) if present.any() else 0.0,
+        'map50_95': float(ap[present].mean()) if present.any() else 0.0,
+        'per_class': per_class,
+        'confusion_matrix': matrix.tolist()
+    }
+
+
+def print_report(report, names):
+    print(f"{'Class':>14} {'Instances':>10} {'P':>8} {'R':>8} {'AP50':>8} {'AP50-95':>8}")
+    print(f"{'all':>14} {report['instances']:>10} {report['precision']:>8.3f} {report['recall']:>8.3f} "
+          f"{report['map50']:>8.3f} {report['map50_95']:>8.3f}")
+    for name, m in report['per_class'].items():
+        if m['instances']:
+            print(f"{name:>14} {m['instances']:>10} {m['precision']:>8.3f} {m['recall']:>8.3f} "
+                  f"{m['ap50']:>8.3f} {m['ap50_95']:>8.3f}")
+    print("\nConfusion matrix (rows = predicted, columns = true, last = background):")
+    labels = list(names) + ['background']
+    width = max(len(l) for l in labels) + 1
+    print(' ' * width + ''.join(f"{l[:10]:>11}" for l in labels))
+    for label, row in zip(labels, report['confusion_matrix']):
+        print(f"{label:>{width}}" + ''.join(f"{v:>11}" for v in row))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate YOLO prediction labels against ground-truth labels.")
+    parser.add_argument('--gt', default='datasets/test/labels', help="Ground-truth label directory")
+    parser.add_argument('--pred', required=True, help="Prediction label directory (class x y w h conf per line)")
+    parser.add_argument('--data', default='subset.yaml', help="Dataset YAML providing class names")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--out', help="Optional path for a JSON report")
+    args = parser.parse_args()
+
+    with open(args.data, 'r') as f:
+        names = yaml.safe_load(f)['names']
+    if isinstance(names, dict):
+        names = [names[k] for k in sorted(names)]
+
+    report = evaluate(args.gt, args.pred, names, workers=args.workers)
+    print_report(report, names)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report written to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,18 @@
 from ultralytics import YOLO
 import os
+import sys
 import shutil
+import argparse
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.decoded_images import DecodedImages, decoded_trainer
+from utils.shards import is_shard_dir, shard_trainer
+
+parser = argparse.ArgumentParser(description="Train the baseline model and promote it to model/baseline.pt.")
+parser.add_argument('--data', default='subset.yaml', help="Dataset YAML, e.g. one generated by scripts/make_subset.py")
+parser.add_argument('--decoded', action='store_true', help="Read frames pre-decoded by scripts/predecode.py instead of the JPEGs")
+args = parser.parse_args()
 
 # Load YOLO model
 model = YOLO('yolov8n.pt')
@@ -20,9 +32,25 @@ existing_runs = [
 next_run_num = max(existing_runs, default=0) + 1
 run_name = f'run{next_run_num}'
 
+# Frames pre-decoded at this imgsz skip JPEG decoding; any others are read as usual
+trainer = None
+if args.decoded:
+    frames = DecodedImages(640)
+    print(f"Using {len(frames)} pre-decoded frame(s)")
+    trainer = decoded_trainer(frames)
+
+# Splits packed by scripts/shards.py (train/val pointing at a pack) are read from the shards
+with open(args.data, 'r') as f:
+    data = yaml.safe_load(f)
+split_paths = [os.path.join(data.get('path', ''), str(data.get(split, ''))) for split in ('train', 'val')]
+if any(is_shard_dir(p) for p in split_paths):
+    print("Reading packed split(s) from shards")
+    trainer = shard_trainer(trainer)
+
 # Train model — will create train_run/run1/, run2/, etc.
 model.train(
-    data='subset.yaml',
+    trainer=trainer,
+    data=args.data,
     epochs=10,
     batch=4,
     imgsz=640,
@@ -2,20 +2,127 @@ import streamlit as st
 import os
 import json
 from streamlit_drawable_canvas import st_canvas
-from PIL import Image
-import datetime
-import yaml
 import random
-from functools import lru_cache
+import datetime
+from utils.thumbnails import ThumbnailCache
+from utils.catalog import Catalog
+from utils.annotation_store import AnnotationStore, DEFAULT_LABELS
+from utils.prefetch import Prefetcher
+from utils.frame_cache import FrameCache
+from utils.working_set import WorkingSet, new_box_id, saved_form, BBOX_TOLERANCE
+
+# Images on each side of the selected one that are loaded ahead of time
+PREFETCH_NEIGHBOURS = 3
+# Memory for resized frames, shared by every session on this server
+FRAME_CACHE_MB = int(os.environ.get('FRAME_CACHE_MB', 64))
+# Images whose boxes a session keeps in memory, and how long edits settle before autosave
+WORKING_SET_SIZE = 8
+AUTOSAVE_SECONDS = 3
+
+# Resized frames live in one byte-budgeted cache for the whole server process
+@st.cache_resource
+def get_frame_cache():
+    return FrameCache(max_bytes=FRAME_CACHE_MB * 1024 * 1024, max_w=640, max_h=480)
+
+# Thumbnails are built once in the background and reused across reruns
+@st.cache_resource
+def get_thumbnail_cache(size):
+    return ThumbnailCache(size=size)
+
+@st.cache_resource
+def get_catalog():
+    return Catalog()
+
+# One annotation database per project, shared by every session
+@st.cache_resource
+def get_annotation_store(project_name):
+    return AnnotationStore(os.path.join("projects", project_name))
+
+# Warms the frame cache and loads the stored boxes in the background for the
+# neighbours of the selected image and the visible page. Each value records the store
+# revision it was read at (read first, so a save in between only makes it look older).
+@st.cache_resource
+def get_prefetcher(project_name):
+    store = get_annotation_store(project_name)
+    frames = get_frame_cache()
+
+    def load(image_path):
+        frames.get(image_path)
+        image = os.path.basename(image_path)
+        revision = store.revision(image)
+        return {'boxes': store.get_boxes(image), 'revision': revision}
+    return Prefetcher(load, workers=2, max_items=64)
+
+# Stored (normalized) boxes -> Fabric rects at the displayed image size
+def boxes_to_canvas(boxes, img_width, img_height, color_map):
+    objects = []
+    for box in boxes:
+        x_center, y_center, w_norm, h_norm = box['bbox']
+        objects.append({
+            'type': 'rect',
+            'left': (x_center - w_norm / 2) * img_width,
+            'top': (y_center - h_norm / 2) * img_height,
+            'width': w_norm * img_width,
+            'height': h_norm * img_height,
+            'stroke': color_map.get(box['label'], '#00FF00'),
+            'fill': 'rgba(0, 255, 0, 0)',
+            'strokeWidth': 2,
+            'box_id': box['id'],
+            'label': box['label']
+        })
+    return {"objects": objects}
 
-# Cache resized images to avoid recomputation on every rerun
-@st.cache_data(show_spinner=False)
-def get_resized_image(image_path, max_w=640, max_h=480):
-    image = Image.open(image_path)
-    scale = min(max_w / image.width, max_h / image.height, 1.0)
-    img_width, img_height = int(image.width * scale), int(image.height * scale)
-    image = image.resize((img_width, img_height))
-    return image, img_width, img_height
+# Fabric rects -> normalized boxes. Resizing a rect in Transform mode changes its
+# scale, not its width/height, so the scale has to be applied here. The canvas JSON
+# drops custom properties, so rects are matched back to the previous boxes by geometry:
+# an unchanged rect keeps its box's id and label, a moved/resized one (one per
+# interaction) takes the box left over at the same place in the order, and anything else is a new box with
+# default_label. Deleting or undoing a box therefore never shifts the others' labels.
+def canvas_to_boxes(objects, img_width, img_height, previous, default_label):
+    drawn = []
+    for obj in objects:
+        if obj['type'] == 'rect':
+            width = obj['width'] * obj.get('scaleX', 1)
+            height = obj['height'] * obj.get('scaleY', 1)
+            drawn.append([
+                (obj['left'] + width / 2) / img_width,
+                (obj['top'] + height / 2) / img_height,
+                width / img_width,
+                height / img_height
+            ])
+    unmatched = list(previous)
+    matches = [None] * len(drawn)
+    for i, bbox in enumerate(drawn):
+        for box in unmatched:
+            if all(abs(u - v) <= BBOX_TOLERANCE for u, v in zip(bbox, box['bbox'])):
+                matches[i] = box
+                unmatched.remove(box)
+                break
+    # A transformed rect keeps its place among the others; a new one is appended
+    position = {box['id']: k for k, box in enumerate(previous)}
+    matched = [position[box['id']] if box is not None else None for box in matches]
+    changed = [i for i, k in enumerate(matched) if k is None]
+    if len(changed) == len(unmatched):
+        for i, box in zip(changed, unmatched):
+            before_drawn = sum(1 for k in matched[:i] if k is not None)
+            before_previous = sum(1 for k in matched if k is not None and k < position[box['id']])
+            if before_drawn == before_previous:
+                matches[i] = box
+    return [
+        {'id': box['id'], 'label': box['label'], 'bbox': bbox} if box is not None
+        else {'id': new_box_id(), 'label': default_label, 'bbox': bbox}
+        for bbox, box in zip(drawn, matches)
+    ]
+
+# Saves settled edits while the page sits idle and shows where autosave stands
+@st.experimental_fragment(run_every=AUTOSAVE_SECONDS)
+def autosave_status():
+    working_set = st.session_state['working_set']
+    working_set.flush()
+    if working_set.dirty():
+        st.caption("✏️ Unsaved edits, autosaving…")
+    elif working_set.last_saved_at is not None:
+        st.caption(f"💾 Autosaved at {datetime.datetime.fromtimestamp(working_set.last_saved_at):%H:%M:%S}")
 
 st.set_page_config(page_title="Manual Annotation", layout="wide")
 
@@ -39,10 +146,36 @@ if len(image_files) == 0:
     st.error("No valid images found for annotation in this project.")
     st.stop()
 
+store = get_annotation_store(project_name)
+prefetcher = get_prefetcher(project_name)
+
+# Autosaves go to the project store; the prefetched copy of a saved image is stale
+def autosave(boxes_by_image):
+    store.save_many({image: saved_form(boxes) for image, boxes in boxes_by_image.items()})
+    for image in boxes_by_image:
+        prefetcher.invalidate(os.path.join(images_dir, image))
+
+# Stored boxes of an image at (at least) the given revision
+def stored_boxes(image_path, revision):
+    loaded = prefetcher.get(image_path)
+    if loaded['revision'] < revision:
+        prefetcher.invalidate(image_path)
+        loaded = prefetcher.get(image_path)
+    return loaded['boxes']
+
+# Boxes being edited in this session; replaced (after saving it) when the project changes
+working_set = st.session_state.get('working_set')
+if working_set is None or st.session_state.get('working_set_project') != project_name:
+    if working_set is not None:
+        working_set.flush(force=True)
+    working_set = st.session_state['working_set'] = WorkingSet(autosave, WORKING_SET_SIZE, AUTOSAVE_SECONDS)
+    st.session_state['working_set_project'] = project_name
+
 # --- LABELS ---
 label_colors = ["#FF0000", "#00FF00", "#0000FF", "#FFA500", "#800080", "#00FFFF", "#FFC0CB", "#A52A2A"]
 if 'label_options' not in st.session_state:
-    st.session_state['label_options'] = ["Animal", "Human", "Vehicle"]
+    # Labels live in the project store so class ids stay the same across sessions
+    st.session_state['label_options'] = store.labels() or list(DEFAULT_LABELS)
 if 'label_color_map' not in st.session_state:
     st.session_state['label_color_map'] = {label: label_colors[i % len(label_colors)] for i, label in enumerate(st.session_state['label_options'])}
 if 'selected_label' not in st.session_state:
@@ -73,14 +206,14 @@ with col1:
     start_idx = st.session_state['img_page'] * IMAGES_PER_PAGE
     end_idx = min(start_idx + IMAGES_PER_PAGE, len(image_files))
     img_cols = st.columns(2)
+    thumbnails = get_thumbnail_cache(180)  # Increased thumbnail size
+    # Current page first, then the next one in the background; rerun cost stays per page
+    thumbnails.warm(image_files[start_idx:end_idx] + image_files[end_idx:end_idx + IMAGES_PER_PAGE])
     for idx, i in enumerate(range(start_idx, end_idx)):
         img_path = image_files[i]
         try:
-            img = Image.open(img_path)
-            scale = min(1.0, 180 / max(img.size))  # Increased thumbnail size
-            thumb = img.resize((int(img.size[0] * scale), int(img.size[1] * scale)))
             with img_cols[idx % 2]:
-                st.image(thumb, width=180)  # Increased width
+                st.image(thumbnails.get(img_path), width=180)  # Increased width
                 if st.button("Select", key=f"btn_{i}"):
                     st.session_state.current_idx = i
                     st.experimental_rerun()
@@ -95,17 +228,25 @@ with col2:
     selected_image_path = image_files[st.session_state.current_idx]
     selected_image_name = os.path.basename(selected_image_path)
     try:
-        # Use cached resized image
-        image, img_width, img_height = get_resized_image(selected_image_path)
+        image, img_width, img_height = get_frame_cache().get_image(selected_image_path)
+        # The canvas sends its background as RGB
+        image = image.convert('RGB')
         st.session_state.img_width = img_width
         st.session_state.img_height = img_height
 
         # --- PERSIST CANVAS STATE ---
-        canvas_key = f"canvas_{selected_image_name}"
-        if 'canvas_states' not in st.session_state:
-            st.session_state['canvas_states'] = {}
-        if canvas_key not in st.session_state['canvas_states']:
-            st.session_state['canvas_states'][canvas_key] = {"objects": []}
+        # Only boxes and labels are kept; the canvas JSON is rebuilt from them each run.
+        # Stored boxes come from the prefetcher, ready right away when it already loaded them.
+        # Both copies are checked against the store's revision, since the pre-labeling job
+        # saves from another process.
+        revision = store.revision(selected_image_name)
+        boxes = working_set.get(selected_image_name, lambda: stored_boxes(selected_image_path, revision), revision)
+        # A (re)load starts a fresh canvas; the old one would send back the boxes it replaced
+        canvas_key = f"canvas_{selected_image_name}_{working_set.generation(selected_image_name)}"
+        # Per-box label widgets of images that left the working set go with them
+        for key in [k for k in st.session_state if str(k).startswith("box_label_canvas_")]:
+            if key.rsplit('_', 1)[0][len("box_label_canvas_"):] not in working_set:
+                del st.session_state[key]
 
         drawing_mode = st.radio(
             "Drawing Mode:",
@@ -121,53 +262,45 @@ with col2:
             height=img_height,
             width=img_width,
             drawing_mode="rect" if drawing_mode == "Draw New Box" else "transform",
-            initial_drawing=st.session_state['canvas_states'][canvas_key],
+            initial_drawing=boxes_to_canvas(boxes, img_width, img_height, st.session_state['label_color_map']),
             key=canvas_key
         )
-        # Save the current canvas state after drawing
+        # Keep the drawn geometry; autosave picks it up once the edits settle
         if canvas_result.json_data and 'objects' in canvas_result.json_data:
-            for idx, obj in enumerate(canvas_result.json_data['objects']):
-                if obj['type'] == 'rect' and 'box_id' not in obj:
-                    obj['box_id'] = idx
-            st.session_state['canvas_states'][canvas_key] = canvas_result.json_data
+            working_set.update(selected_image_name, canvas_to_boxes(
+                canvas_result.json_data['objects'], img_width, img_height,
+                boxes, st.session_state['selected_label']
+            ))
         st.session_state.canvas_result = canvas_result
         # Single Save Annotations button at the bottom of column 2
         annotation_dir = os.path.join("projects", project_name, "labels")
         os.makedirs(annotation_dir, exist_ok=True)
-        if st.button("💾 Save Annotations", key="save_annotations_btn_col2"):
-            objects = st.session_state['canvas_states'][canvas_key]['objects']
-            yolo_lines = []
-            yaml_annots = []
-            image, img_width, img_height = get_resized_image(os.path.join("projects", project_name, "images", selected_image_name))
-            for i, obj in enumerate(objects):
-                if obj['type'] == 'rect':
-                    left, top = obj['left'], obj['top']
-                    width, height = obj['width'], obj['height']
-                    x_center = (left + width / 2) / img_width
-                    y_center = (top + height / 2) / img_height
-                    w_norm = width / img_width
-                    h_norm = height / img_height
-                    label = obj.get('label', label_options[0])
-                    class_id = label_options.index(label)
-                    yolo_lines.append(f"{class_id} {x_center:.6f} {y_center:.6f} {w_norm:.6f} {h_norm:.6f}\n")
-                    yaml_annots.append({
-                        'label': label,
-                        'bbox': [x_center, y_center, w_norm, h_norm]
-                    })
-            # Save YOLO format
-            label_path = os.path.join(annotation_dir, selected_image_name.rsplit('.', 1)[0] + '.txt')
-            with open(label_path, 'w') as f:
-                f.writelines(yolo_lines)
-            # Save YAML format (optional, for richer info)
-            yaml_path = os.path.join(annotation_dir, selected_image_name.rsplit('.', 1)[0] + '.yaml')
-            yaml_data = {
-                'image': os.path.join("projects", project_name, "images", selected_image_name),
-                'annotations': yaml_annots,
-                'timestamp': str(datetime.datetime.now())
-            }
-            with open(yaml_path, 'w') as f:
-                yaml.dump(yaml_data, f)
+        save_col, export_col = st.columns(2)
+        with save_col:
+            save_clicked = st.button("💾 Save Annotations", key="save_annotations_btn_col2")
+        with export_col:
+            export_clicked = st.button("📄 Export YAML", key="export_yaml_btn_col2")
+        if save_clicked:
+            # Saved even when autosave already stored it, then only changed .txt files are rewritten
+            if not working_set.flush(force=True, images=[selected_image_name]):
+                autosave({selected_image_name: working_set.get(selected_image_name, None)})
+            store.export_yolo(annotation_dir)
+            get_catalog().set_status(project_name, selected_image_name, 'labeled')
             st.success("✅ Annotations saved successfully!")
+        if export_clicked:
+            # YAML format (optional, for richer info) is written only on request
+            count = store.export_yaml(annotation_dir)
+            st.success(f"✅ Exported YAML for {count} image(s) to {annotation_dir}")
+
+        # Queue the neighbours first, then the rest of the visible page
+        current = st.session_state.current_idx
+        neighbours = [
+            image_files[(current + step) % len(image_files)]
+            for offset in range(1, PREFETCH_NEIGHBOURS + 1) for step in (offset, -offset)
+        ]
+        prefetcher.warm(neighbours + image_files[start_idx:end_idx])
+
+        autosave_status()
 
     except Exception as e:
         st.error(f"Error loading image {selected_image_path}: {str(e)}")
@@ -183,22 +316,23 @@ with col3:
         st.session_state['label_color_map'] = {label: ["#FF0000", "#00FF00", "#0000FF"][i % 3] for i, label in enumerate(label_options)}
     selected_image_name = os.path.basename(image_files[st.session_state.get('current_idx', 0)])
     canvas_key = f"canvas_{selected_image_name}"
-    box_objects = st.session_state.get('canvas_states', {}).get(canvas_key, {}).get('objects', [])
-    if not box_objects or all(obj['type'] != 'rect' for obj in box_objects):
+    box_list = working_set.get(selected_image_name, None)
+    if not box_list:
         st.info("Draw bounding boxes on the image to assign labels.")
     else:
-        for idx, obj in enumerate(box_objects):
-            if obj['type'] != 'rect':
-                continue
-            box_label_key = f"box_label_{canvas_key}_{idx}"
-            current_label = obj.get('label', label_options[0])
+        relabeled = []
+        # Widgets are keyed by box id, so a deleted box takes its selection with it
+        for idx, box in enumerate(box_list):
+            box_label_key = f"box_label_{canvas_key}_{box['id']}"
+            current_label = box['label']
             selected_label = st.selectbox(
                 f"Box {idx+1}",
                 label_options,
                 index=label_options.index(current_label) if current_label in label_options else 0,
                 key=box_label_key
             )
-            obj['label'] = selected_label
+            relabeled.append({'id': box['id'], 'label': selected_label, 'bbox': box['bbox']})
+        working_set.update(selected_image_name, relabeled)
 
 # --- COLUMN 4: ADD LABEL ---
 with col4:
@@ -207,11 +341,21 @@ with col4:
     if st.button("Add Label", key="add_label_btn"):
         if new_label and (new_label not in label_options):
             label_options.append(new_label)
+            store.add_labels([new_label])
             rand_color = "#" + ''.join([random.choice('0123456789ABCDEF') for _ in range(6)])
             st.session_state['label_color_map'][new_label] = rand_color
             st.success(f"Label '{new_label}' added!")
         elif new_label:
             st.warning(f"Label '{new_label}' already exists.")
 
+# Edits that settled during this run are saved now; idle ones by autosave_status
+working_set.flush()
+
+stats = get_frame_cache().stats()
+st.sidebar.caption(
+    f"Frame cache: {stats['entries']} frames, {stats['bytes'] / 1e6:.1f}/{stats['max_bytes'] / 1e6:.0f} MB, "
+    f"{stats['hit_rate']:.0%} hits ({stats['hits']}/{stats['hits'] + stats['misses']}), {stats['evictions']} evicted"
+)
+
 if st.button("⬅️ Back to New Project"):
     st.switch_page("pages/new_project.py")
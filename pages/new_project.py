@@ -1,11 +1,17 @@
 import streamlit as st
 import os
 import zipfile
-import io
 import importlib.util
+from utils.zip_import import import_zip
+from utils.catalog import Catalog
+from utils import prelabel_job
 
 st.set_page_config(page_title="Create New Project", layout="wide")
 
+@st.cache_resource
+def get_catalog():
+    return Catalog()
+
 st.title("📦 Create New Project")
 
 # Project name input
@@ -18,6 +24,7 @@ if st.button("Create Project"):
         images_dir = os.path.join(project_dir, "images")
         if not os.path.exists(images_dir):
             os.makedirs(images_dir)
+            get_catalog().ensure_project(project_name)
             st.success(f"Project '{project_name}' created!")
         else:
             st.warning(f"Project '{project_name}' already exists.")
@@ -34,25 +41,48 @@ zip_file = st.file_uploader(
     accept_multiple_files=False
 )
 
-SUPPORTED_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+server_zip_path = st.text_input("…or path to a .zip already on this server (for very large archives)", "")
+
+zip_source = zip_file or (server_zip_path if server_zip_path and os.path.isfile(server_zip_path) else None)
+if server_zip_path and not zip_file and zip_source is None:
+    st.error(f"File not found: {server_zip_path}")
 
-if zip_file and project_name:
+# Streamlit reruns the page on every interaction — import each archive only once
+if zip_file:
+    import_key = (project_name, zip_file.file_id)
+elif zip_source:
+    import_key = (project_name, os.path.abspath(zip_source), os.path.getmtime(zip_source))
+else:
+    import_key = None
+
+if zip_source and project_name and st.session_state.get('last_import') != import_key:
     project_dir = os.path.join("projects", project_name)
     images_dir = os.path.join(project_dir, "images")
     if not os.path.exists(images_dir):
         st.error("Please create the project first.")
     else:
-        with zipfile.ZipFile(io.BytesIO(zip_file.read())) as z:
-            valid_files = [f for f in z.namelist() if f.lower().endswith(SUPPORTED_EXTS)]
-            if not valid_files:
+        # The uploaded file is already seekable, so the zip is read in place rather than copied
+        progress_bar = st.progress(0.0, text="Importing…")
+        def show_progress(done, total, filename):
+            progress_bar.progress(done / total, text=f"Importing {done}/{total}: {filename}")
+        try:
+            summary = import_zip(zip_source, images_dir, progress=show_progress)
+        except zipfile.BadZipFile:
+            st.error("The uploaded file is not a valid .zip archive.")
+        else:
+            progress_bar.empty()
+            get_catalog().add_images(project_name, summary['imported'])
+            st.session_state['last_import'] = import_key
+            if summary['total'] == 0:
                 st.error("No supported image files found in the uploaded zip.")
             else:
-                for file in valid_files:
-                    filename = os.path.basename(file)
-                    if filename:
-                        with z.open(file) as source, open(os.path.join(images_dir, filename), "wb") as target:
-                            target.write(source.read())
-                st.success(f"Uploaded {len(valid_files)} image(s) to '{project_name}/images'!")
+                st.success(f"Uploaded {len(summary['imported'])} image(s) to '{project_name}/images'!")
+                if summary['duplicates']:
+                    st.info(f"Skipped {len(summary['duplicates'])} duplicate image(s) already in the project.")
+                if summary['renamed']:
+                    st.info(f"Renamed {len(summary['renamed'])} image(s) whose file name was already taken.")
+                for filename, error in summary['invalid']:
+                    st.warning(f"Skipped unreadable image {filename}: {error}")
 
 st.markdown("---")
 
@@ -69,7 +99,39 @@ with col1:
             st.warning("Please enter a project name first.")
 
 with col2:
-    st.button("⚡ Automatic Annotation")
+    if st.button("⚡ Automatic Annotation"):
+        if not project_name:
+            st.warning("Please enter a project name first.")
+        elif not os.path.exists(os.path.join("projects", project_name, "images")):
+            st.error("Please create the project first.")
+        elif not os.path.exists("model/baseline.pt"):
+            st.error("No trained model found at model/baseline.pt.")
+        elif prelabel_job.start_job(os.path.join("projects", project_name)):
+            st.success("Pre-labeling started in the background.")
+        else:
+            st.info("A pre-labeling job is already running for this project.")
+
+# Polls the job's status file without blocking the rest of the page
+@st.experimental_fragment(run_every=2)
+def show_prelabel_status(project_dir):
+    status = prelabel_job.read_status(project_dir)
+    if status is None:
+        return
+    state, done, total = status.get('state'), status.get('done', 0), status.get('total', 0)
+    if state in ('starting', 'running'):
+        st.progress(done / total if total else 0.0, text=f"⚡ Pre-labeling {done}/{total} image(s)…")
+        if st.button("✖ Cancel pre-labeling"):
+            prelabel_job.cancel_job(project_dir)
+            st.info("Cancelling after the current batch…")
+    elif state == 'finished':
+        st.success(f"⚡ Pre-labeling finished: {done} image(s) have proposed boxes ready for review.")
+    elif state == 'cancelled':
+        st.warning(f"⚡ Pre-labeling cancelled after {done}/{total} image(s).")
+    elif state == 'failed':
+        st.error(f"⚡ Pre-labeling failed: {status.get('error', 'unknown error')}")
+
+if project_name and os.path.isdir(os.path.join("projects", project_name)):
+    show_prelabel_status(os.path.join("projects", project_name))
 
 if st.button("⬅️ Back to Home"):
     st.switch_page("Home.py")
@@ -0,0 +1,93 @@
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.prelabel_job import write_status, cancel_requested
+
+SUPPORTED_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def batched(items, batch_size):
+    for i in range(0, len(items), batch_size):
+        yield items[i:i + batch_size]
+
+
+# Detections -> store boxes (normalized xywh, label name, confidence)
+def result_to_boxes(result):
+    return [
+        {
+            'label': result.names[int(cls)],
+            'bbox': [float(v) for v in box],
+            'confidence': float(conf),
+            'source': 'prelabel'
+        }
+        for box, conf, cls in zip(result.xywhn, result.conf, result.cls)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-label a project's images with the baseline model.")
+    parser.add_argument('--project-dir', required=True, help="e.g. projects/hit_uav")
+    parser.add_argument('--model', default='model/baseline.pt')
+    parser.add_argument('--backend', help="pytorch, onnx, openvino or openvino-int8 (default: 'active' in model/backends.yaml)")
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--overwrite-prelabels', action='store_true', help="Redo images that were already pre-labeled")
+    args = parser.parse_args()
+
+    project_dir = args.project_dir
+    project_name = os.path.basename(os.path.normpath(project_dir))
+    images_dir = os.path.join(project_dir, 'images')
+    pid = os.getpid()
+
+    try:
+        # Heavy imports live in here so that a broken environment is reported as 'failed'
+        from utils.annotation_store import AnnotationStore
+        from utils.catalog import Catalog
+        from utils.prediction_cache import PredictionCache, cached_predict
+        from utils.backends import load_model
+
+        store = AnnotationStore(project_dir)
+        catalog = Catalog()
+
+        # Never touch images a person has saved; optionally skip earlier proposals too
+        skip_sources = ['manual', 'import'] if args.overwrite_prelabels else ['manual', 'import', 'prelabel']
+        skip = set(store.annotated_images(skip_sources))
+        image_names = sorted(f for f in os.listdir(images_dir) if f.lower().endswith(SUPPORTED_EXTS))
+        pending = [f for f in image_names if f not in skip]
+        total = len(pending)
+        write_status(project_dir, state='running', pid=pid, done=0, total=total, skipped=len(image_names) - total)
+        print(f"Pre-labeling {total} image(s), skipping {len(image_names) - total}.", flush=True)
+
+        model, weights = load_model(args.model, args.backend)
+        cache = PredictionCache()
+        done = 0
+        for batch in batched(pending, args.batch_size):
+            if cancel_requested(project_dir):
+                write_status(project_dir, state='cancelled', pid=pid, done=done, total=total)
+                print("Cancelled.", flush=True)
+                return
+            paths = [os.path.join(images_dir, f) for f in batch]
+            proposals = {}
+            for name, result in zip(batch, cached_predict(model, weights, paths, cache, conf=args.conf, batch_size=args.batch_size)):
+                proposals[name] = result_to_boxes(result)
+            # A person may have saved one of these while the batch was running
+            for name in set(proposals) & set(store.annotated_images(['manual'])):
+                del proposals[name]
+            store.save_many(proposals, source='prelabel')
+            store.export_yolo()
+            catalog.set_status_many(project_name, list(proposals), 'prelabeled')
+            done += len(batch)
+            write_status(project_dir, state='running', pid=pid, done=done, total=total)
+            print(f"{done}/{total}", flush=True)
+
+        write_status(project_dir, state='finished', pid=pid, done=done, total=total)
+        print("✅ Pre-labeling complete.", flush=True)
+    except Exception as e:
+        write_status(project_dir, state='failed', pid=pid, error=str(e))
+        raise
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+import ultralytics
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import datetime
+import itertools
+import cv2
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.prediction_cache import Detections, weights_digest
+from utils.backends import load_model
+from utils.shards import ShardReader, is_shard_dir
+
+SUPPORTED_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+STAGES = ('decode', 'preprocess', 'forward', 'nms', 'write')
+
+
+def list_images(source_dir):
+    return sorted(
+        os.path.join(source_dir, f) for f in os.listdir(source_dir)
+        if f.lower().endswith(SUPPORTED_EXTS)
+    )
+
+
+def summarize(values):
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return {'mean': 0.0, 'p50': 0.0, 'p95': 0.0}
+    return {
+        'mean': round(float(values.mean()), 3),
+        'p50': round(float(np.percentile(values, 50)), 3),
+        'p95': round(float(np.percentile(values, 95)), 3)
+    }
+
+
+def write_labels(detections, out_dir):
+    label_path = os.path.join(out_dir, os.path.splitext(os.path.basename(detections.path))[0] + '.txt')
+    with open(label_path, 'w') as f:
+        f.writelines(
+            f"{int(c)} {x:.6f} {y:.6f} {w:.6f} {h:.6f} {s:.6f}\n" for c, x, y, w, h, s in detections.data
+        )
+
+
+# One pass over the images with a fixed batch size, thread count and imgsz.
+# Per-image stage times in ms: decode and write are timed here, preprocess/forward/nms
+# come from the predictor's own Results.speed (already divided by the batch size).
+# imread turns a path into a BGR array (cv2.imread, or ShardReader.imread for a pack).
+# The model must have been loaded with load_model(threads=threads).
+def run_config(model, image_paths, batch_size, threads, imgsz, conf, warmup, out_dir, imread=cv2.imread):
+    batches = [image_paths[i:i + batch_size] for i in range(0, len(image_paths), batch_size)]
+    for batch in batches[:warmup]:
+        model.predict(source=[imread(p) for p in batch], imgsz=imgsz, conf=conf, verbose=False)
+
+    times = {stage: [] for stage in STAGES}
+    batch_latency = []
+    wall_start = time.perf_counter()
+    for batch in batches:
+        t0 = time.perf_counter()
+        arrays = [imread(p) for p in batch]
+        t1 = time.perf_counter()
+        results = model.predict(source=arrays, imgsz=imgsz, conf=conf, save=False, verbose=False)
+        t2 = time.perf_counter()
+        for path, result in zip(batch, results):
+            result.path = path
+            write_labels(Detections.from_result(result), out_dir)
+        t3 = time.perf_counter()
+
+        n = len(batch)
+        times['decode'].extend([(t1 - t0) * 1000 / n] * n)
+        times['write'].extend([(t3 - t2) * 1000 / n] * n)
+        for result in results:
+            times['preprocess'].append(result.speed['preprocess'])
+            times['forward'].append(result.speed['inference'])
+            times['nms'].append(result.speed['postprocess'])
+        batch_latency.append((t3 - t0) * 1000)
+    wall = time.perf_counter() - wall_start
+
+    return {
+        'batch_size': batch_size,
+        'threads': threads,
+        'imgsz': imgsz,
+        'images': len(image_paths),
+        'images_per_sec': round(len(image_paths) / wall, 3) if wall > 0 else 0.0,
+        'stages_ms_per_image': {stage: summarize(times[stage]) for stage in STAGES},
+        'batch_latency_ms': summarize(batch_latency)
+    }
+
+
+def environment(model_path, weights):
+    return {
+        'timestamp': str(datetime.datetime.now()),
+        'model': model_path,
+        'weights': weights,
+        'weights_sha1': weights_digest(weights),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'torch': torch.__version__,
+        'ultralytics': ultralytics.__version__,
+        'opencv': cv2.__version__,
+        'numpy': np.__version__
+    }
+
+
+def print_row(row):
+    stages = row['stages_ms_per_image']
+    print(f"{row['batch_size']:>5} {row['threads']:>7} {row['imgsz']:>5} {row['images_per_sec']:>8.2f} "
+          + ' '.join(f"{stages[s]['p50']:>7.2f}/{stages[s]['p95']:<7.2f}" for s in STAGES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark inference throughput and per-stage latency.")
+    parser.add_argument('--model', default='model/baseline.pt')
+    parser.add_argument('--backend', help="pytorch, onnx, openvino or openvino-int8 (default: 'active' in model/backends.yaml)")
+    parser.add_argument('--source', default='datasets/test_subset', help="Directory of images, or a scripts/shards.py pack, to run on")
+    parser.add_argument('--max-images', type=int, default=None, help="Use only the first N images")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 4, 8, 16])
+    parser.add_argument('--threads', type=int, nargs='+', default=[os.cpu_count() or 1])
+    parser.add_argument('--imgsz', type=int, nargs='+', default=[640])
+    parser.add_argument('--conf', type=float, default=0.2)
+    parser.add_argument('--warmup', type=int, default=1, help="Untimed batches before each configuration")
+    parser.add_argument('--out', default='runs/benchmark/report.json', help="Machine-readable JSON report")
+    args = parser.parse_args()
+
+    imread = cv2.imread
+    if is_shard_dir(args.source):
+        shards = ShardReader(args.source)
+        image_paths = [shards.path(i) for i in range(len(shards))][:args.max_images]
+        imread = shards.imread
+    else:
+        image_paths = list_images(args.source)[:args.max_images]
+    if not image_paths:
+        print(f"❌ No images found in {args.source}.")
+        return
+    # Labels go to a scratch folder; the write stage is measured, not kept
+    out_dir = tempfile.mkdtemp(prefix='bench_labels_')
+
+    print(f"{len(image_paths)} image(s), stage columns are p50/p95 ms per image")
+    print(f"{'batch':>5} {'threads':>7} {'imgsz':>5} {'img/s':>8} " + ' '.join(f"{s:>15}" for s in STAGES))
+    rows = []
+    try:
+        # The thread count is fixed when a runtime session is created, so each (threads, imgsz)
+        # pair gets a freshly loaded model that serves all batch sizes
+        for threads, imgsz in itertools.product(args.threads, args.imgsz):
+            model, weights = load_model(args.model, args.backend, imgsz=imgsz, threads=threads)
+            for batch_size in args.batch_sizes:
+                row = run_config(model, image_paths, batch_size, threads, imgsz, args.conf, args.warmup, out_dir, imread)
+                row['weights'] = weights
+                print_row(row)
+                rows.append(row)
+            del model
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+    with open(args.out, 'w') as f:
+        json.dump({'environment': environment(args.model, rows[0]['weights']), 'source': args.source, 'results': rows}, f, indent=2)
+    best = max(rows, key=lambda r: r['images_per_sec'])
+    print(f"\n✅ Best: {best['images_per_sec']:.2f} img/s at batch {best['batch_size']}, "
+          f"{best['threads']} thread(s), imgsz {best['imgsz']}. Report written to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
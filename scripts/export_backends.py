@@ -0,0 +1,99 @@
+from ultralytics import YOLO
+import os
+import sys
+import argparse
+import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.backends import EXPORT_FORMATS, DEFAULT_BACKEND, load_registry, save_registry, parity_report
+from utils.prediction_cache import PredictionCache, cached_predict, file_digest
+from utils.shards import ShardReader, is_shard_dir, shard_predict
+
+SUPPORTED_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def list_images(source_dir):
+    return sorted(
+        os.path.join(source_dir, f) for f in os.listdir(source_dir)
+        if f.lower().endswith(SUPPORTED_EXTS)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export the baseline to faster CPU runtimes and allow each one only if it matches PyTorch."
+    )
+    parser.add_argument('--model', default='model/baseline.pt')
+    parser.add_argument('--formats', nargs='+', default=['onnx'], choices=sorted(EXPORT_FORMATS))
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--data', default='subset.yaml', help="Calibration data for int8 quantization")
+    parser.add_argument('--val', default='datasets/val/images', help="Images the parity check runs on (folder or scripts/shards.py pack)")
+    parser.add_argument('--max-images', type=int, default=None, help="Check only the first N val images")
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--iou', type=float, default=0.8, help="IoU at which two boxes count as the same detection")
+    parser.add_argument('--min-match', type=float, default=0.98, help="Required share of matched boxes")
+    parser.add_argument('--max-conf-diff', type=float, default=0.02, help="Allowed mean confidence difference")
+    parser.add_argument('--int8-min-match', type=float, default=0.95, help="--min-match for quantized backends")
+    parser.add_argument('--int8-max-conf-diff', type=float, default=0.05, help="--max-conf-diff for quantized backends")
+    parser.add_argument('--activate', help="Backend to switch all inference scripts to if it passes (or 'pytorch')")
+    args = parser.parse_args()
+
+    registry = load_registry()
+    source_sha1 = file_digest(args.model)
+    cache = PredictionCache()
+    # A packed val split is streamed from its shards; a folder is read file by file
+    if is_shard_dir(args.val):
+        shards = ShardReader(args.val)
+        count = len(shards) if args.max_images is None else min(args.max_images, len(shards))
+
+        def predict(model, model_path):
+            return list(shard_predict(model, model_path, shards, cache, imgsz=args.imgsz, conf=args.conf,
+                                      limit=args.max_images))
+    else:
+        val_paths = list_images(args.val)[:args.max_images]
+        count = len(val_paths)
+
+        def predict(model, model_path):
+            return list(cached_predict(model, model_path, val_paths, cache, imgsz=args.imgsz, conf=args.conf))
+
+    print(f"PyTorch reference on {count} image(s) from {args.val}")
+    reference = predict(YOLO(args.model), args.model)
+
+    for name in args.formats:
+        export_args = EXPORT_FORMATS[name]
+        print(f"\nExporting {name}...")
+        extra = {'data': args.data} if export_args.get('int8') else {}
+        exported_path = YOLO(args.model).export(imgsz=args.imgsz, **export_args, **extra)
+
+        candidate = predict(YOLO(exported_path, task='detect'), exported_path)
+        report = parity_report(reference, candidate, iou_thr=args.iou)
+        min_match = args.int8_min_match if export_args.get('int8') else args.min_match
+        max_conf_diff = args.int8_max_conf_diff if export_args.get('int8') else args.max_conf_diff
+        passed = report['match_rate'] >= min_match and report['conf_diff_mean'] <= max_conf_diff
+
+        registry['backends'][name] = {
+            'path': str(exported_path),
+            'source': args.model,
+            'source_sha1': source_sha1,
+            'imgsz': args.imgsz,
+            'exported_at': str(datetime.datetime.now()),
+            'parity': report,
+            'passed': passed
+        }
+        status = "✅ passed" if passed else "❌ failed"
+        print(f"{status}: {report['match_rate']:.2%} of boxes matched (need {min_match:.0%}), "
+              f"mean confidence difference {report['conf_diff_mean']:.4f} (max {max_conf_diff})")
+
+    if args.activate:
+        entry = registry['backends'].get(args.activate)
+        if args.activate == DEFAULT_BACKEND or (entry and entry['passed'] and entry['source_sha1'] == source_sha1):
+            registry['active'] = args.activate
+            print(f"\n✅ Inference scripts now use the {args.activate} backend.")
+        else:
+            print(f"\n⚠️ {args.activate} has not passed parity for this baseline; keeping {registry['active']}.")
+    save_registry(registry)
+    print(f"Registry written to model/backends.yaml (active: {registry['active']})")
+
+
+if __name__ == '__main__':
+    main()
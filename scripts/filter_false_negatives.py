@@ -1,78 +1,199 @@
-from ultralytics import YOLO
 import os
+import sys
+import argparse
+import numpy as np
 import yaml
 
-# Load trained model
-model = YOLO('model/baseline.pt')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.box_ops import load_yolo_labels, label_path_for, match_ground_truth
+from utils.prediction_cache import PredictionCache, cached_predict
+from utils.backends import load_model
+from utils.decoded_images import DecodedImages
+
+SUPPORTED_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
 
 # Define paths
 project_root = os.getcwd()
 test_subset_dir = 'datasets/test_subset/'
+test_labels_dir = 'datasets/test/labels/'
 false_negative_labels_dir = 'annotations/false_negatives/'
+metadata_file = 'annotations/potential_false_negatives.yaml'
+checkpoint_file = 'annotations/filter_checkpoint.txt'
+
+
+def list_images(source_dir):
+    return sorted(
+        os.path.join(source_dir, f) for f in os.listdir(source_dir)
+        if f.lower().endswith(SUPPORTED_EXTS)
+    )
 
-# Make sure output folder exists
-os.makedirs(false_negative_labels_dir, exist_ok=True)
 
-# Run inference on test subset
-results = model.predict(source=test_subset_dir, save=False, conf=0.2)
+# Paths already handled by an earlier (possibly interrupted) run
+def load_processed():
+    processed = set()
+    if os.path.exists(checkpoint_file):
+        with open(checkpoint_file, 'r') as f:
+            processed.update(line.strip() for line in f if line.strip())
+    # Records flushed right before a crash may not have reached the checkpoint yet
+    if os.path.exists(metadata_file):
+        with open(metadata_file, 'r') as f:
+            for item in yaml.safe_load(f) or []:
+                processed.add(item['image_path'])
+    return processed
 
-# User-defined threshold
-user_threshold = 0.5
 
-# Metadata to save
-potential_false_negatives = []
+def batched(items, batch_size):
+    for i in range(0, len(items), batch_size):
+        yield items[i:i + batch_size]
 
-# Process results
-for result in results:
+
+# Write the label file for a flagged image and return its metadata record
+def flag_false_negative(result, confs, missed_objects=None):
     image_path = result.path
     image_name = os.path.basename(image_path).replace('.jpg', '.txt')
+    print(f"Potential false negative: {image_name}")
 
-    # Extract confidence scores
-    if result.boxes is not None and len(result.boxes) > 0:
-        confs = result.boxes.conf.cpu().numpy()
-    else:
-        confs = []
-
-    # If no detection ≥ threshold — flag as potential false negative
-    if len(confs) == 0 or all(c < user_threshold for c in confs):
-        print(f"Potential false negative: {image_name}")
-
-        # Save model predictions (if any) as YOLO format to false_negative_labels_dir
-        pred_label_path = os.path.join(false_negative_labels_dir, image_name)
-        with open(pred_label_path, 'w') as f:
-            if result.boxes is not None and len(result.boxes) > 0:
-                for box, conf, cls in zip(
-                    result.boxes.xywhn.cpu().numpy(),  # normalized xywh format
-                    confs,
-                    result.boxes.cls.cpu().numpy()
-                ):
-                    line = f"{int(cls)} {box[0]:.6f} {box[1]:.6f} {box[2]:.6f} {box[3]:.6f}\n"
-                    f.write(line)
-            else:
-                # No predictions — leave file empty or optionally skip creating it
-                pass
-
-        # Store metadata for YAML
-        detections = []
-        if result.boxes is not None and len(result.boxes) > 0:
+    # Save model predictions (if any) as YOLO format to false_negative_labels_dir
+    pred_label_path = os.path.join(false_negative_labels_dir, image_name)
+    with open(pred_label_path, 'w') as f:
+        if len(result) > 0:
             for box, conf, cls in zip(
-                result.boxes.xyxy.cpu().numpy(),  # absolute xyxy for YAML
+                result.xywhn,  # normalized xywh format
                 confs,
-                result.boxes.cls.cpu().numpy()
+                result.cls
             ):
-                detections.append({
-                    'bbox': box.tolist(),
-                    'confidence': float(conf),
-                    'label': result.names[int(cls)]
-                })
-
-        potential_false_negatives.append({
-            'image_path': os.path.relpath(image_path, project_root),
-            'detections': detections
+                line = f"{int(cls)} {box[0]:.6f} {box[1]:.6f} {box[2]:.6f} {box[3]:.6f}\n"
+                f.write(line)
+
+    # Store metadata for YAML
+    detections = []
+    if len(result) > 0:
+        for box, conf, cls in zip(
+            result.xyxy,  # absolute xyxy for YAML
+            confs,
+            result.cls
+        ):
+            detections.append({
+                'bbox': box.tolist(),
+                'confidence': float(conf),
+                'label': result.names[int(cls)]
+            })
+
+    record = {
+        'image_path': os.path.relpath(image_path, project_root),
+        'detections': detections
+    }
+    if missed_objects is not None:
+        record['missed_objects'] = missed_objects
+    return record
+
+
+# Ground-truth objects the model did not find, in the same absolute xyxy form as detections
+def describe_missed(result, gt, missed, best_iou):
+    img_h, img_w = result.orig_shape
+    missed_objects = []
+    for (cls, x, y, w, h), iou in zip(gt[missed], best_iou[missed]):
+        missed_objects.append({
+            'bbox': [round(float((x - w / 2) * img_w), 2), round(float((y - h / 2) * img_h), 2),
+                     round(float((x + w / 2) * img_w), 2), round(float((y + h / 2) * img_h), 2)],
+            'label': result.names.get(int(cls), str(int(cls))),
+            'width': round(float(w * img_w), 2),
+            'height': round(float(h * img_h), 2),
+            'area': round(float(w * h), 6),  # normalized, for quick small-object filtering
+            'best_iou': round(float(iou), 4)
         })
+    return missed_objects
+
+
+# Decide which results of one batch to flag. Images with a ground-truth label file are
+# matched object by object; images without one fall back to the confidence rule.
+def flag_batch(results, threshold, labels_dir, iou_thr):
+    confs, preds, gts, has_gt = [], [], [], []
+    for result in results:
+        conf = result.conf
+        pred = result.data[:, :5]
+        gt = load_yolo_labels(label_path_for(result.path, labels_dir))
+        confs.append(conf)
+        preds.append(pred[conf >= threshold])
+        gts.append(gt if gt is not None else np.zeros((0, 5), dtype=np.float32))
+        has_gt.append(gt is not None)
+
+    # One vectorized IoU pass for the whole batch
+    missed, best_iou = match_ground_truth(gts, preds, iou_thr=iou_thr)
+
+    records = []
+    for i, result in enumerate(results):
+        if has_gt[i]:
+            if missed[i].any():
+                missed_objects = describe_missed(result, gts[i], missed[i], best_iou[i])
+                records.append(flag_false_negative(result, confs[i], missed_objects))
+        # If no detection ≥ threshold — flag as potential false negative
+        elif len(confs[i]) == 0 or (confs[i] < threshold).all():
+            records.append(flag_false_negative(result, confs[i]))
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flag potential false negatives with the baseline model.")
+    parser.add_argument('--source', default=test_subset_dir, help="Directory of images to scan")
+    parser.add_argument('--model', default='model/baseline.pt')
+    parser.add_argument('--backend', help="pytorch, onnx, openvino or openvino-int8 (default: 'active' in model/backends.yaml)")
+    parser.add_argument('--batch-size', type=int, default=16, help="Images per predict call")
+    parser.add_argument('--conf', type=float, default=0.2, help="Minimum confidence kept by the model")
+    parser.add_argument('--threshold', type=float, default=0.5, help="Detections below this confidence count as missing")
+    parser.add_argument('--labels-dir', default=test_labels_dir, help="Ground-truth YOLO labels for images not in an images/ folder")
+    parser.add_argument('--iou', type=float, default=0.5, help="IoU a detection needs to count as finding a labelled object")
+    parser.add_argument('--fresh', action='store_true', help="Ignore the checkpoint and start over")
+    parser.add_argument('--sliced', action='store_true', help="Also run on overlapping tiles to find tiny, distant targets")
+    parser.add_argument('--tile', type=int, default=320, help="Tile size in pixels for --sliced")
+    parser.add_argument('--overlap', type=float, default=0.2, help="Minimum overlap between neighbouring tiles")
+    parser.add_argument('--merge', choices=['nms', 'wbf'], default='nms', help="How boxes from different tiles are merged")
+    parser.add_argument('--hot-delta', type=int, default=40,
+                        help="Skip tiles whose hottest pixel is less than this above the frame median")
+    parser.add_argument('--decoded', action='store_true', help="Read frames pre-decoded by scripts/predecode.py instead of the JPEGs")
+    args = parser.parse_args()
+
+    # Make sure output folder exists
+    os.makedirs(false_negative_labels_dir, exist_ok=True)
+
+    if args.fresh:
+        for path in (checkpoint_file, metadata_file):
+            if os.path.exists(path):
+                os.remove(path)
+
+    processed = load_processed()
+    pending = [p for p in list_images(args.source) if os.path.relpath(p, project_root) not in processed]
+    print(f"{len(processed)} image(s) already processed, {len(pending)} to go.")
+    if not pending:
+        print("Nothing to do — pass --fresh to rescan from scratch.")
+        return
+
+    # Load trained model; predictions for unchanged weights and images come from the cache
+    model, weights = load_model(args.model, args.backend)
+    cache = PredictionCache()
+    frames = DecodedImages(640) if args.decoded else None
+    slicing = None
+    if args.sliced:
+        slicing = {'tile': args.tile, 'overlap': args.overlap, 'merge': args.merge, 'hot_delta': args.hot_delta}
+
+    # Records are appended one list item at a time, so the YAML stays valid after every flush
+    with open(metadata_file, 'a') as meta_f, open(checkpoint_file, 'a') as ckpt_f:
+        for batch in batched(pending, args.batch_size):
+            results = list(cached_predict(
+                model, weights, batch, cache, conf=args.conf, batch_size=args.batch_size, slicing=slicing, frames=frames
+            ))
+            for record in flag_batch(results, args.threshold, args.labels_dir, args.iou):
+                yaml.dump([record], meta_f)
+            for result in results:
+                ckpt_f.write(os.path.relpath(result.path, project_root) + '\n')
+
+            meta_f.flush()
+            os.fsync(meta_f.fileno())
+            ckpt_f.flush()
+            os.fsync(ckpt_f.fileno())
+
+    print("False negative filtering complete.")
 
-# Save metadata to YAML
-with open('annotations/potential_false_negatives.yaml', 'w') as f:
-    yaml.dump(potential_false_negatives, f)
 
-print("False negative filtering complete.")
+if __name__ == '__main__':
+    main()
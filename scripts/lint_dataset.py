@@ -0,0 +1,87 @@
+import os
+import sys
+import json
+import argparse
+from collections import Counter
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.dataset_lint import LintCache, lint_split, WARNINGS
+from utils.annotation_store import AnnotationStore, DEFAULT_LABELS, STORE_NAME
+
+DEFAULT_SPLITS = ['datasets/train', 'datasets/val', 'datasets/test']
+
+
+# Project label dirs use the project store's class ids, not the dataset names
+def project_names(project_dir):
+    if os.path.exists(os.path.join(project_dir, STORE_NAME)):
+        return AnnotationStore(project_dir).labels()
+    return list(DEFAULT_LABELS)
+
+
+def default_targets():
+    targets = [(split, None) for split in DEFAULT_SPLITS if os.path.isdir(split)]
+    if os.path.isdir('projects'):
+        for name in sorted(os.listdir('projects')):
+            project_dir = os.path.join('projects', name)
+            if os.path.isdir(os.path.join(project_dir, 'images')):
+                targets.append((project_dir, project_names(project_dir)))
+    return targets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check dataset images and YOLO labels before training or filtering.")
+    parser.add_argument('splits', nargs='*', help="Folders with images/ and labels/ (default: datasets/train, val, test and every project)")
+    parser.add_argument('--data', default='subset.yaml', help="Dataset YAML to take class names from")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--no-cache', action='store_true', help="Re-check every file instead of reusing cached results")
+    parser.add_argument('--max-issues', type=int, default=20, help="Issues printed per split (all go to --out)")
+    parser.add_argument('--out', help="Write every issue to this JSON file")
+    parser.add_argument('--strict', action='store_true', help="Exit with status 1 when any error is found")
+    args = parser.parse_args()
+
+    with open(args.data, 'r') as f:
+        names = yaml.safe_load(f)['names']
+    if args.splits:
+        targets = [(split, project_names(split) if os.path.abspath(split).startswith(os.path.abspath('projects')) else None)
+                   for split in args.splits]
+    else:
+        targets = default_targets()
+    cache = None if args.no_cache else LintCache()
+
+    report, errors = {}, 0
+    for split, split_names in targets:
+        if not os.path.isdir(os.path.join(split, 'images')) and not os.path.isdir(os.path.join(split, 'labels')):
+            print(f"⚠️ {split} has no images/ or labels/ folder; skipped.")
+            continue
+        found, checked, total = lint_split(split, split_names or names, cache, workers=args.workers)
+        counts = Counter(i['code'] for issues in found.values() for i in issues)
+        split_errors = sum(n for code, n in counts.items() if code not in WARNINGS)
+        errors += split_errors
+        report[split] = found
+
+        icon = '❌' if split_errors else ('⚠️' if counts else '✅')
+        summary = ', '.join(f"{n} {code}" for code, n in sorted(counts.items())) or 'no issues'
+        print(f"{icon} {split}: {total} file(s), {checked} checked, {total - checked} from cache — {summary}")
+        shown = 0
+        for path, issues in found.items():
+            for i in issues:
+                if i['code'] in WARNINGS or shown >= args.max_issues:
+                    continue
+                where = f"{path}:{i['line']}" if i['line'] else path
+                print(f"    {where}  [{i['code']}] {i['message']}")
+                shown += 1
+        if split_errors > shown:
+            print(f"    … {split_errors - shown} more")
+
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.out}")
+    if args.strict and errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+import os
+import sys
+import argparse
+from collections import defaultdict
+import numpy as np
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.label_index import LabelIndex, IMAGE_EXTS
+
+subsets_dir = 'subsets'
+
+
+# HIT-UAV names frames <day/night>_<altitude>_<camera angle>_<?>_<frame id>;
+# anything else falls into a single 'unknown' condition
+def capture_conditions(stem):
+    parts = stem.split('_')
+    if len(parts) >= 3 and all(p.isdigit() for p in parts[:3]):
+        return tuple(parts[:3])
+    return ('unknown',)
+
+
+# Split n across strata proportionally to their size (largest remainder, ties by seed)
+def allocate(sizes, n, rng):
+    sizes = np.asarray(sizes, dtype=np.float64)
+    quota = sizes / sizes.sum() * n
+    counts = np.floor(quota).astype(int)
+    remainder = quota - counts
+    jitter = rng.random(len(sizes)) * 1e-6
+    for i in np.argsort(-(remainder + jitter))[:n - counts.sum()]:
+        counts[i] += 1
+    return np.minimum(counts, sizes.astype(int))
+
+
+def build_subset(split_dir, n, seed, names):
+    images_dir = os.path.join(split_dir, 'images')
+    labels_dir = os.path.join(split_dir, 'labels')
+    index = LabelIndex.build(labels_dir, names)
+
+    image_files = {os.path.splitext(f)[0]: f for f in os.listdir(images_dir) if f.lower().endswith(IMAGE_EXTS)}
+    stems = sorted(image_files)
+
+    # Each image is keyed by its capture conditions and the rarest class it contains,
+    # so images holding rare classes are never drowned out by the common ones
+    per_image = index.per_image_class_counts()
+    class_freq = per_image.sum(0)
+    rarity = np.argsort(class_freq)
+    row_of = {str(s): i for i, s in enumerate(index.stems)}
+    strata = defaultdict(list)
+    for stem in stems:
+        row = row_of.get(stem)
+        present = per_image[row] > 0 if row is not None else np.zeros(len(class_freq), dtype=bool)
+        rarest = next((int(c) for c in rarity if present[c]), -1)
+        strata[capture_conditions(stem) + (rarest,)].append(stem)
+
+    rng = np.random.default_rng(seed)
+    keys = sorted(strata)
+    counts = allocate([len(strata[k]) for k in keys], min(n, len(stems)), rng)
+    chosen = []
+    for key, count in zip(keys, counts):
+        members = strata[key]
+        picks = rng.choice(len(members), size=count, replace=False)
+        chosen.extend(members[i] for i in sorted(picks))
+    chosen.sort()
+    return [os.path.abspath(os.path.join(images_dir, image_files[s])) for s in chosen], index
+
+
+# Dataset YAML split paths made absolute, so a copy of the YAML written anywhere else
+# still points at the same images. Relative paths resolve like ultralytics does: against
+# `path` if set, otherwise against the directory of the YAML they were read from.
+def absolute_splits(data, yaml_path):
+    root = os.path.join(os.path.dirname(os.path.abspath(yaml_path)), str(data.get('path') or ''))
+    data['path'] = os.path.abspath(root)
+    for split in ('train', 'val', 'test'):
+        value = data.get(split)
+        if isinstance(value, str):
+            data[split] = os.path.abspath(os.path.join(root, value))
+        elif isinstance(value, list):
+            data[split] = [os.path.abspath(os.path.join(root, v)) for v in value]
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sample a stratified training subset as an ultralytics file list.")
+    parser.add_argument('-n', type=int, default=100, help="Number of images to sample")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--source', default='datasets/train', help="Split with images/ and labels/ folders")
+    parser.add_argument('--data', default='subset.yaml', help="Dataset YAML to take val split and class names from")
+    parser.add_argument('--name', help="Output name (default: train_<n>_seed<seed>)")
+    args = parser.parse_args()
+
+    with open(args.data, 'r') as f:
+        data = absolute_splits(yaml.safe_load(f), args.data)
+    name = args.name or f"train_{args.n}_seed{args.seed}"
+
+    image_paths, index = build_subset(args.source, args.n, args.seed, data['names'])
+
+    os.makedirs(subsets_dir, exist_ok=True)
+    list_path = os.path.join(subsets_dir, name + '.txt')
+    with open(list_path, 'w') as f:
+        f.writelines(p + '\n' for p in image_paths)
+
+    # Same dataset YAML, but training reads the file list instead of a copied folder
+    data['train'] = os.path.abspath(list_path)
+    yaml_path = os.path.join(subsets_dir, name + '.yaml')
+    with open(yaml_path, 'w') as f:
+        yaml.dump(data, f, sort_keys=False)
+
+    chosen = {os.path.splitext(os.path.basename(p))[0] for p in image_paths}
+    mask = np.isin(index.stems, list(chosen))
+    counts = index.per_image_class_counts()[mask].sum(0)
+    print(f"✅ Sampled {len(image_paths)} image(s) from {args.source}")
+    for cls_name, count in zip(data['names'], counts):
+        print(f"  {cls_name}: {count} box(es)")
+    print(f"File list: {list_path}")
+    print(f"Data YAML: {yaml_path}  (python model/Train.py --data {yaml_path})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.decoded_images import build
+
+DEFAULT_SOURCES = ['datasets/train/images', 'datasets/val/images', 'datasets/test/images', 'datasets/test_subset']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode dataset images once into memory-mapped frame files.")
+    parser.add_argument('sources', nargs='*', default=DEFAULT_SOURCES, help="Image folders to pre-decode")
+    parser.add_argument('--imgsz', type=int, default=640, help="Must match the imgsz of the training/inference run")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--rebuild', action='store_true', help="Rewrite the frame files from scratch, dropping dead space")
+    args = parser.parse_args()
+
+    for source in args.sources:
+        if not os.path.isdir(source):
+            print(f"⚠️ {source} not found; skipped.")
+            continue
+        report = build(source, args.imgsz, args.workers, args.rebuild)
+        print(f"✅ {source}: {report['images']} frame(s), {report['decoded']} decoded now, "
+              f"{report['bytes'] / 1e6:.1f} MB in {report['cache_dir']}")
+        if report['dead_bytes'] > report['bytes'] // 4:
+            print(f"  {report['dead_bytes'] / 1e6:.1f} MB belong to removed or changed images; run with --rebuild to reclaim it.")
+        for path in report['failed']:
+            print(f"  ❌ Could not decode {path}")
+    print("Use with --decoded (model/Train.py, scripts/retrain.py, scripts/filter_false_negatives.py).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+from ultralytics import YOLO
+import os
+import sys
+import argparse
+import numpy as np
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.active_learning import ScoreCache, detection_uncertainty, combine_uncertainty, l2_normalize, kcenter_rank
+from utils.review_queue import ReviewIndex
+from utils.prediction_cache import PredictionCache, cached_predict
+from utils.backends import load_model, resolve_backend
+
+SUPPORTED_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# Define paths
+project_root = os.getcwd()
+test_subset_dir = 'datasets/test_subset/'
+false_negative_labels_dir = 'annotations/false_negatives/'
+ranked_queue_file = 'annotations/review_queue.yaml'
+
+
+def list_images(source_dir):
+    return sorted(
+        os.path.join(source_dir, f) for f in os.listdir(source_dir)
+        if f.lower().endswith(SUPPORTED_EXTS)
+    )
+
+
+def batched(items, batch_size):
+    for i in range(0, len(items), batch_size):
+        yield items[i:i + batch_size]
+
+
+# Forward every image the cache has no entry for under this model version
+# Boxes come from the configured backend; embeddings need the PyTorch graph
+def score_stale(model, detector, weights, cache, image_paths, batch_size, conf, imgsz):
+    stale = cache.stale(image_paths)
+    print(f"Model {cache.model_version}: {len(image_paths) - len(stale)} cached, {len(stale)} to score.")
+    predictions = PredictionCache()
+    for done, batch in enumerate(batched(stale, batch_size), start=1):
+        results = list(cached_predict(detector, weights, batch, predictions, imgsz=imgsz, conf=conf, batch_size=batch_size))
+        embeddings = model.embed(source=batch, imgsz=imgsz, verbose=False)
+        for path, result, embedding in zip(batch, results, embeddings):
+            entropy, margin = detection_uncertainty(result.conf)
+            cache.put(path, entropy, margin, embedding.cpu().numpy().ravel(), result.data)
+        # Saved per batch so an interrupted run keeps what it already paid for
+        cache.save()
+        print(f"{min(done * batch_size, len(stale))}/{len(stale)}", flush=True)
+
+
+# Proposals for queued images the apps have no label file for yet
+def write_proposals(image_path, boxes):
+    label_path = os.path.join(false_negative_labels_dir, os.path.splitext(os.path.basename(image_path))[0] + '.txt')
+    if os.path.exists(label_path):
+        return
+    with open(label_path, 'w') as f:
+        for cls, x, y, w, h, _ in boxes:
+            f.write(f"{int(cls)} {x:.6f} {y:.6f} {w:.6f} {h:.6f}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank unreviewed images by uncertainty and diversity for review.")
+    parser.add_argument('--source', default=test_subset_dir, help="Directory of images to rank")
+    parser.add_argument('--model', default='model/baseline.pt')
+    parser.add_argument('--backend', help="pytorch, onnx, openvino or openvino-int8 (default: 'active' in model/backends.yaml)")
+    parser.add_argument('--batch-size', type=int, default=16, help="Images per predict call")
+    parser.add_argument('--conf', type=float, default=0.05, help="Low threshold so uncertain boxes are seen")
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('-n', type=int, default=100, help="Length of the ranked queue")
+    parser.add_argument('--pool-factor', type=int, default=3,
+                        help="Diversity picks from the n * pool-factor most uncertain images")
+    parser.add_argument('--entropy-weight', type=float, default=0.5, help="Entropy vs. margin in the uncertainty score")
+    parser.add_argument('--out', default=ranked_queue_file)
+    args = parser.parse_args()
+
+    os.makedirs(false_negative_labels_dir, exist_ok=True)
+    review_index = ReviewIndex()
+    image_paths = list_images(args.source)
+    unreviewed = [p for p in image_paths if not review_index.is_reviewed(os.path.relpath(p, project_root))]
+    reviewed = [p for p in image_paths if review_index.is_reviewed(os.path.relpath(p, project_root))]
+    if not unreviewed:
+        print("Every image in the source has been reviewed.")
+        return
+
+    # The cache is per backend, conf and imgsz, so resolve the weights before loading anything
+    _, weights = resolve_backend(args.model, args.backend, imgsz=args.imgsz)
+    cache = ScoreCache(args.model, weights, args.conf, args.imgsz)
+    if cache.stale(unreviewed):
+        detector, weights = load_model(args.model, args.backend, imgsz=args.imgsz)
+        score_stale(YOLO(args.model), detector, weights, cache, unreviewed, args.batch_size, args.conf, args.imgsz)
+
+    entries = [cache.get(p) for p in unreviewed]
+    uncertainty = combine_uncertainty(
+        [e['entropy'] for e in entries], [e['margin'] for e in entries], args.entropy_weight
+    )
+    features = l2_normalize([e['embedding'] for e in entries])
+
+    # Diversity only among the uncertain part, measured against what was already reviewed
+    pool = np.argsort(-uncertainty, kind='stable')[:args.n * args.pool_factor]
+    labeled = [cache.get(p) for p in reviewed]
+    labeled_features = l2_normalize([e['embedding'] for e in labeled if e is not None]) if any(labeled) else None
+    picked, picked_dist = kcenter_rank(features[pool], uncertainty[pool], args.n, labeled_features)
+
+    records = []
+    for rank, (i, dist) in enumerate(zip(pool[picked], picked_dist), start=1):
+        entry = entries[i]
+        write_proposals(unreviewed[i], entry['boxes'])
+        records.append({
+            'image_path': os.path.relpath(unreviewed[i], project_root),
+            'rank': rank,
+            'uncertainty': round(float(uncertainty[i]), 4),
+            'entropy': round(entry['entropy'], 4),
+            'margin': round(entry['margin'], 4),
+            'diversity': round(dist, 4) if np.isfinite(dist) else None,
+            'model_version': cache.model_version
+        })
+
+    os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+    tmp_path = args.out + '.tmp'
+    with open(tmp_path, 'w') as f:
+        yaml.dump(records, f, sort_keys=False)
+    os.replace(tmp_path, args.out)
+    print(f"✅ Ranked {len(records)} of {len(unreviewed)} unreviewed image(s) into {args.out}")
+
+
+if __name__ == '__main__':
+    main()
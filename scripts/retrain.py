@@ -0,0 +1,231 @@
+from ultralytics import YOLO
+import os
+import sys
+import glob
+import json
+import shutil
+import argparse
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.annotation_store import AnnotationStore, STORE_NAME
+from evaluation.compare_results import evaluate, print_report
+from scripts.make_subset import build_subset, absolute_splits
+from utils.prediction_cache import PredictionCache, cached_predict
+from utils.decoded_images import DecodedImages, decoded_trainer
+
+corrected_ann_dir = 'annotations/corrected_yaml/'
+projects_dir = 'projects'
+project_dir = 'train_run'
+model_save_path = 'model/baseline.pt'
+
+
+def next_run_name(prefix):
+    os.makedirs(project_dir, exist_ok=True)
+    existing_runs = [
+        int(d[len(prefix):])
+        for d in os.listdir(project_dir)
+        if os.path.isdir(os.path.join(project_dir, d)) and d.startswith(prefix) and d[len(prefix):].isdigit()
+    ]
+    return f'{prefix}{max(existing_runs, default=0) + 1}'
+
+
+# Everything a person has corrected: {image_path: [(label, [x, y, w, h]), ...]}
+def collect_corrections(include_projects):
+    corrections = {}
+    for path in sorted(glob.glob(os.path.join(corrected_ann_dir, '*.yaml'))):
+        with open(path, 'r') as f:
+            data = yaml.safe_load(f) or {}
+        if data.get('image') and os.path.exists(data['image']):
+            corrections[data['image']] = [(a['label'], a['bbox']) for a in data.get('annotations', [])]
+    for name in include_projects:
+        project_path = os.path.join(projects_dir, name)
+        store = AnnotationStore(project_path)
+        for image in store.annotated_images(['manual']):
+            image_path = os.path.join(project_path, 'images', image)
+            if os.path.exists(image_path):
+                corrections[image_path] = [(b['label'], b['bbox']) for b in store.get_boxes(image)]
+    return corrections
+
+
+# Link the corrected images next to freshly written label files, since their original
+# label files (if any) still hold the uncorrected boxes
+def write_corrected_split(corrections, names, label_map, out_dir):
+    images_dir = os.path.join(out_dir, 'images')
+    labels_dir = os.path.join(out_dir, 'labels')
+    os.makedirs(images_dir, exist_ok=True)
+    os.makedirs(labels_dir, exist_ok=True)
+    class_ids = {n: i for i, n in enumerate(names)}
+    image_paths, dropped = [], {}
+    for i, (source_path, boxes) in enumerate(sorted(corrections.items())):
+        # Prefix keeps images with the same name from different projects apart
+        filename = f"{i:05d}_{os.path.basename(source_path)}"
+        target = os.path.join(images_dir, filename)
+        try:
+            os.symlink(os.path.abspath(source_path), target)
+        except OSError:
+            shutil.copy(source_path, target)
+        lines = []
+        for label, (x, y, w, h) in boxes:
+            label = label_map.get(label, label)
+            if label not in class_ids:
+                dropped[label] = dropped.get(label, 0) + 1
+                continue
+            lines.append(f"{class_ids[label]} {x:.6f} {y:.6f} {w:.6f} {h:.6f}\n")
+        with open(os.path.join(labels_dir, os.path.splitext(filename)[0] + '.txt'), 'w') as f:
+            f.writelines(lines)
+        image_paths.append(os.path.abspath(target))
+    return image_paths, dropped
+
+
+# Predict a split and write YOLO labels with confidences for the evaluator.
+# The baseline's predictions come from the cache after the first retrain.
+def write_predictions(weights, image_paths, out_dir, batch_size, conf, imgsz, frames=None):
+    os.makedirs(out_dir, exist_ok=True)
+    model = YOLO(weights)
+    for result in cached_predict(model, weights, image_paths, PredictionCache(), imgsz=imgsz, conf=conf,
+                                 batch_size=batch_size, frames=frames):
+        with open(os.path.join(out_dir, os.path.splitext(os.path.basename(result.path))[0] + '.txt'), 'w') as f:
+            f.writelines(
+                f"{int(c)} {x:.6f} {y:.6f} {w:.6f} {h:.6f} {score:.6f}\n" for c, x, y, w, h, score in result.data
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fine-tune the baseline on corrected annotations plus a replay sample, and promote it only if it scores better."
+    )
+    parser.add_argument('--data', default='subset.yaml', help="Dataset YAML providing the val split and class names")
+    parser.add_argument('--projects', nargs='*', default=None,
+                        help="Projects whose manually saved labels are included (default: all)")
+    parser.add_argument('--map', action='append', default=[], metavar='FROM=TO',
+                        help="Rename a project label to a dataset class, e.g. --map Human=Person")
+    parser.add_argument('--replay-source', default='datasets/train', help="Original split to replay from")
+    parser.add_argument('--replay-ratio', type=float, default=2.0, help="Replay images per corrected image")
+    parser.add_argument('--min-replay', type=int, default=50)
+    parser.add_argument('--epochs', type=int, default=30)
+    parser.add_argument('--patience', type=int, default=5, help="Stop after this many epochs without val improvement")
+    parser.add_argument('--freeze', type=int, default=10, help="Freeze the first N layers (backbone) while fine-tuning")
+    parser.add_argument('--lr0', type=float, default=0.001)
+    parser.add_argument('--batch', type=int, default=4)
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--eval-split', default='datasets/test', help="Split with images/ and labels/ used for promotion")
+    parser.add_argument('--conf', type=float, default=0.001, help="Confidence threshold for evaluation predictions")
+    parser.add_argument('--min-gain', type=float, default=0.0, help="Required mAP50-95 improvement to promote")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--decoded', action='store_true', help="Read frames pre-decoded by scripts/predecode.py instead of the JPEGs")
+    args = parser.parse_args()
+
+    with open(args.data, 'r') as f:
+        # The run's data.yaml is written under train_run/, so keep val/test pointing at the source dataset
+        data = absolute_splits(yaml.safe_load(f), args.data)
+    names = data['names']
+    if isinstance(names, dict):
+        names = [names[k] for k in sorted(names)]
+    label_map = dict(m.split('=', 1) for m in args.map)
+
+    if not os.path.exists(model_save_path):
+        print(f"❌ No baseline found at {model_save_path}. Run model/Train.py first.")
+        exit()
+
+    projects = args.projects
+    if projects is None:
+        projects = [
+            d for d in sorted(os.listdir(projects_dir))
+            if os.path.exists(os.path.join(projects_dir, d, STORE_NAME))
+        ] if os.path.isdir(projects_dir) else []
+    corrections = collect_corrections(projects)
+    if not corrections:
+        print("⚠️ No corrected annotations found. Nothing to retrain on.")
+        exit()
+
+    run_name = next_run_name('retrain')
+    run_dir = os.path.join(project_dir, run_name)
+    os.makedirs(run_dir, exist_ok=True)
+
+    corrected_paths, dropped = write_corrected_split(corrections, names, label_map, os.path.join(run_dir, 'corrected'))
+    for label, count in dropped.items():
+        print(f"⚠️ Dropped {count} box(es) labeled '{label}' (not a dataset class; use --map {label}=<class>)")
+
+    # Replaying a stratified sample of the original data keeps the model from forgetting it
+    n_replay = max(args.min_replay, int(len(corrected_paths) * args.replay_ratio))
+    replay_paths, _ = build_subset(args.replay_source, n_replay, args.seed, names)
+    list_path = os.path.join(run_dir, 'train.txt')
+    with open(list_path, 'w') as f:
+        f.writelines(p + '\n' for p in corrected_paths + replay_paths)
+    data['train'] = os.path.abspath(list_path)
+    data_path = os.path.join(run_dir, 'data.yaml')
+    with open(data_path, 'w') as f:
+        yaml.dump(data, f, sort_keys=False)
+    print(f"Fine-tuning on {len(corrected_paths)} corrected + {len(replay_paths)} replay image(s)")
+
+    frames = DecodedImages(args.imgsz) if args.decoded else None
+    model = YOLO(model_save_path)
+    model.train(
+        trainer=decoded_trainer(frames) if frames is not None else None,
+        data=data_path,
+        epochs=args.epochs,
+        patience=args.patience,
+        freeze=args.freeze,
+        lr0=args.lr0,
+        warmup_epochs=0,
+        batch=args.batch,
+        imgsz=args.imgsz,
+        project=project_dir,
+        name=os.path.join(run_name, 'train'),
+        exist_ok=True
+    )
+
+    weights_dir = os.path.join(run_dir, 'train', 'weights')
+    candidate_path = os.path.join(weights_dir, 'best.pt')
+    if not os.path.exists(candidate_path):
+        candidate_path = os.path.join(weights_dir, 'last.pt')
+    if not os.path.exists(candidate_path):
+        print(f"❌ No weights found in {weights_dir}.")
+        exit()
+
+    # Corrected images may come from the eval split; their old labels are exactly what
+    # was fixed, so they are left out of the comparison
+    eval_images = os.path.join(args.eval_split, 'images')
+    eval_labels = os.path.join(args.eval_split, 'labels')
+    corrected_names = {os.path.basename(p) for p in corrections}
+    eval_paths = sorted(
+        os.path.join(eval_images, f) for f in os.listdir(eval_images)
+        if f.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')) and f not in corrected_names
+    )
+    eval_stems = [os.path.splitext(os.path.basename(p))[0] for p in eval_paths]
+
+    reports = {}
+    for tag, weights in (('baseline', model_save_path), ('candidate', candidate_path)):
+        pred_dir = os.path.join(run_dir, 'eval', tag)
+        write_predictions(weights, eval_paths, pred_dir, args.batch, args.conf, args.imgsz, frames)
+        reports[tag] = evaluate(eval_labels, pred_dir, names, workers=os.cpu_count() or 1, stems=eval_stems)
+        print(f"\n{tag} on {args.eval_split} ({len(eval_stems)} image(s)):")
+        print_report(reports[tag], names)
+
+    gain = reports['candidate']['map50_95'] - reports['baseline']['map50_95']
+    promoted = gain > args.min_gain
+    with open(os.path.join(run_dir, 'retrain_report.json'), 'w') as f:
+        json.dump({
+            'corrected_images': len(corrected_paths),
+            'replay_images': len(replay_paths),
+            'candidate': candidate_path,
+            'gain_map50_95': gain,
+            'promoted': promoted,
+            'baseline': reports['baseline'],
+            'retrained': reports['candidate']
+        }, f, indent=2)
+
+    if promoted:
+        # Keep the previous weights around for a rollback
+        shutil.copy(model_save_path, os.path.splitext(model_save_path)[0] + '_prev.pt')
+        shutil.copy(candidate_path, model_save_path)
+        print(f"\n✅ mAP50-95 {reports['baseline']['map50_95']:.3f} → {reports['candidate']['map50_95']:.3f}. "
+              f"Updated baseline.pt from {candidate_path}")
+    else:
+        print(f"\n⚠️ mAP50-95 {reports['baseline']['map50_95']:.3f} → {reports['candidate']['map50_95']:.3f} "
+              f"(gain {gain:+.3f}). Baseline kept.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.shards import pack_split, unpack_split, ShardReader, DEFAULT_SHARD_BYTES
+from utils.label_index import IMAGE_EXTS
+
+shards_dir = 'shards'
+DEFAULT_SPLITS = ['datasets/train', 'datasets/val', 'datasets/test']
+
+
+def pack(args):
+    for split in args.splits:
+        if not os.path.isdir(os.path.join(split, 'images')):
+            print(f"⚠️ {split} has no images/ folder; skipped.")
+            continue
+        out_dir = os.path.join(args.out, os.path.basename(os.path.normpath(split)))
+        start = time.perf_counter()
+        reader = pack_split(split, out_dir, args.shard_mb * 1024 * 1024)
+        size = sum(os.path.getsize(os.path.join(out_dir, f)) for f in os.listdir(out_dir))
+        print(f"✅ {split} -> {out_dir}: {len(reader)} image(s) in {reader.num_shards} shard(s), "
+              f"{size / 1e6:.1f} MB, {time.perf_counter() - start:.1f}s")
+
+
+def unpack(args):
+    count = unpack_split(args.shard_dir, args.out)
+    print(f"✅ Restored {count} image(s) with labels to {args.out}")
+
+
+def read_bytes(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+# Stream a pack and compare every record, byte for byte, with the split it was packed from
+def verify(args):
+    reader = ShardReader(args.shard_dir)
+    images_dir = os.path.join(reader.source, 'images')
+    labels_dir = os.path.join(reader.source, 'labels')
+    mismatched, start, nbytes = 0, time.perf_counter(), 0
+    for name, data, _, label_file in reader:
+        nbytes += len(data)
+        expected_label = read_bytes(os.path.join(labels_dir, os.path.splitext(name)[0] + '.txt'))
+        if read_bytes(os.path.join(images_dir, name)) != data or expected_label != label_file:
+            mismatched += 1
+            print(f"  ❌ {name} differs from {reader.source}")
+    # Images added to the split after packing
+    packed = set(reader.names)
+    for name in sorted(os.listdir(images_dir)):
+        if name.lower().endswith(IMAGE_EXTS) and name not in packed:
+            mismatched += 1
+            print(f"  ❌ {name} is in {reader.source} but not in the pack")
+    elapsed = time.perf_counter() - start
+    print(f"{'✅' if not mismatched else '❌'} {len(reader)} record(s) streamed in {elapsed:.2f}s "
+          f"({nbytes / 1e6 / max(elapsed, 1e-9):.0f} MB/s), {mismatched} mismatched")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack YOLO splits into large shard files, or restore them.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    pack_parser = commands.add_parser('pack', help="Pack splits (images/ + labels/) into shards")
+    pack_parser.add_argument('splits', nargs='*', default=DEFAULT_SPLITS)
+    pack_parser.add_argument('--out', default=shards_dir, help="Each split goes to <out>/<split name>")
+    pack_parser.add_argument('--shard-mb', type=int, default=DEFAULT_SHARD_BYTES // (1024 * 1024), help="Target shard size")
+    pack_parser.set_defaults(run=pack)
+
+    unpack_parser = commands.add_parser('unpack', help="Restore images/ and labels/ from a pack")
+    unpack_parser.add_argument('shard_dir')
+    unpack_parser.add_argument('out')
+    unpack_parser.set_defaults(run=unpack)
+
+    verify_parser = commands.add_parser('verify', help="Check a pack against the split it was made from")
+    verify_parser.add_argument('shard_dir')
+    verify_parser.set_defaults(run=verify)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == '__main__':
+    main()
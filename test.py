@@ -1,10 +1,12 @@
 import streamlit as st
 import os
 import yaml
-import json
 from streamlit_drawable_canvas import st_canvas
-from PIL import Image
-import datetime
+from utils.annotation_journal import AnnotationJournal
+from utils.thumbnails import ThumbnailCache
+from utils.review_queue import ReviewIndex, render_review_queue
+from utils.frame_cache import FrameCache
+from utils.canvas_display import ZOOM_LEVELS, native_size, display_size, rescale_objects, rect_to_native
 import base64
 from io import BytesIO
 
@@ -29,8 +31,12 @@ st.title("📸 Infrared Object Detection - Manual Annotation Tool")
 false_neg_labels_dir = 'annotations/false_negatives/'
 corrected_ann_dir = 'annotations/corrected_yaml/'
 metadata_file = 'annotations/potential_false_negatives.yaml'
+ranked_queue_file = 'annotations/review_queue.yaml'
 json_tracking_file = 'annotations/box_changes.json'
 
+# Thumbnails rendered per page of the review queue
+IMAGES_PER_PAGE = 12
+
 os.makedirs(false_neg_labels_dir, exist_ok=True)
 os.makedirs(corrected_ann_dir, exist_ok=True)
 os.makedirs(os.path.dirname(json_tracking_file), exist_ok=True)
@@ -68,35 +74,41 @@ def create_text_label(x, y, text):
         'selectable': False
     }
 
+# One journal per server process, shared by every session
+@st.cache_resource
+def get_journal():
+    return AnnotationJournal(json_tracking_file)
+
+# Thumbnails are built once in the background and reused across reruns
+@st.cache_resource
+def get_thumbnail_cache(size):
+    return ThumbnailCache(size=size)
+
+@st.cache_resource
+def get_review_index():
+    return ReviewIndex()
+
+# Display-sized canvas backgrounds, one entry per image and zoom, shared by all sessions
+@st.cache_resource
+def get_frame_cache():
+    return FrameCache()
+
 def save_to_json(image_path, objects, labels):
     try:
-        if os.path.exists(json_tracking_file):
-            with open(json_tracking_file, 'r') as f:
-                tracking_data = json.load(f)
-        else:
-            tracking_data = {}
-        image_entry = {
-            'image_path': image_path,
-            'boxes': [],
-            'timestamp': str(datetime.datetime.now())
-        }
+        boxes = []
         for i, obj in enumerate(objects):
             if obj["type"] == "rect":
-                box_data = {
+                boxes.append({
                     'box_id': obj.get('box_id', f'Box {i+1}'),
-                    'coordinates': {
-                        'left': obj['left'],
-                        'top': obj['top'],
-                        'width': obj['width'],
-                        'height': obj['height']
-                    },
+                    'coordinates': dict(zip(
+                        ('left', 'top', 'width', 'height'),
+                        (round(v, 2) for v in rect_to_native(obj, st.session_state.display_size, st.session_state.native_size))
+                    )),
                     'label': labels[i] if i < len(labels) else 'Unknown',
                     'is_original': obj.get('is_original', False)
-                }
-                image_entry['boxes'].append(box_data)
-        tracking_data[image_path] = image_entry
-        with open(json_tracking_file, 'w') as f:
-            json.dump(tracking_data, f, indent=2)
+                })
+        # Appends only when the boxes differ from the last recorded state
+        get_journal().record(image_path, boxes)
         return True
     except Exception as e:
         st.error(f"Error saving to JSON: {str(e)}")
@@ -115,27 +127,64 @@ def delete_box_from_canvas(box_id):
         return False
     
 
-# Load metadata YAML
-if not os.path.exists(metadata_file):
-    st.error("No potential_false_negatives.yaml found.")
+# Load metadata YAML: the flagged false negatives, or the ranking from scripts/rank_queue.py
+queue_files = {
+    "Flagged false negatives": metadata_file,
+    "Active learning ranking": ranked_queue_file
+}
+available_queues = [name for name, path in queue_files.items() if os.path.exists(path)]
+if not available_queues:
+    st.error("No potential_false_negatives.yaml or review_queue.yaml found.")
     st.stop()
+queue_name = st.sidebar.radio("Review queue", available_queues)
+metadata_file = queue_files[queue_name]
 
-with open(metadata_file, 'r') as f:
-    annotations_data = yaml.safe_load(f)
+# Keep the boxes in place when the zoom changes: rescale the latest canvas objects to the
+# new canvas size and remount the canvas with them
+def on_zoom_change():
+    old_size = st.session_state.get('display_size')
+    if old_size is None:
+        return
+    objects = st.session_state.get('canvas_objects', [])
+    canvas_result = st.session_state.get('canvas_result')
+    if canvas_result is not None and canvas_result.json_data is not None:
+        objects = canvas_result.json_data.get('objects', objects)
+    new_size = display_size(*st.session_state.native_size, st.session_state.canvas_zoom)
+    st.session_state['canvas_objects'] = rescale_objects(objects, new_size[0] / old_size[0], new_size[1] / old_size[1])
+    st.session_state['canvas_key'] = st.session_state.get('canvas_key', 0) + 1
 
-# Filter out images that don't exist and store full paths
-image_files = []
-for item in annotations_data:
-    img_path = item['image_path']
-    if os.path.exists(img_path):
-        image_files.append(img_path)
-    else:
-        st.warning(f"Image not found: {img_path}")
+st.sidebar.select_slider(
+    "Canvas zoom", options=ZOOM_LEVELS, value=1.0, key='canvas_zoom',
+    format_func=lambda z: f"{z:.0%}", on_change=on_zoom_change
+)
+
+# Filter out images that don't exist and store full paths.
+# Parsed once per version of the metadata file instead of on every rerun.
+@st.cache_data(show_spinner=False)
+def load_flagged_images(metadata_file, mtime):
+    with open(metadata_file, 'r') as f:
+        annotations_data = yaml.safe_load(f) or []
+    image_files, missing_files = [], []
+    for item in annotations_data:
+        img_path = item['image_path']
+        if os.path.exists(img_path):
+            image_files.append(img_path)
+        else:
+            missing_files.append(img_path)
+    return image_files, missing_files
+
+image_files, missing_files = load_flagged_images(metadata_file, os.path.getmtime(metadata_file))
+for img_path in missing_files:
+    st.warning(f"Image not found: {img_path}")
 
 if len(image_files) == 0:
     st.error("No valid images found for annotation. Please check the image directory.")
     st.stop()
 
+# The queue may have changed (or been switched) since the last run
+if st.session_state.get('current_idx', 0) >= len(image_files):
+    st.session_state.current_idx = 0
+
 # Layout: sidebar for thumbnails, main canvas, label controls
 col1, col2, col3 = st.columns([1, 3, 1])
 
@@ -150,42 +199,32 @@ selected_image_path = image_files[st.session_state.current_idx]
 with col1:
     st.subheader("Images")
 
-    num_images = len(image_files)
-    thumb_size = 80  # default thumbnail size in px
-
-    if num_images > 12:
-        thumb_size = 60
-    elif num_images > 20:
-        thumb_size = 50
-
-    cols = st.columns(3)  # Adjust grid layout — 3 images per row for example
+    thumb_size = 80  # thumbnail size in px; the page size keeps the grid bounded
 
-    for idx, img_path in enumerate(image_files):
-        with cols[idx % 3]:
-            try:
-                img = Image.open(img_path)
-                img.thumbnail((thumb_size, thumb_size))
-
-                # Show image thumbnail
-                st.image(img, use_column_width=True)
-
-                # Select button
-                if st.button(f"Select {idx+1}", key=f"thumb_{idx}"):
-                    st.session_state.current_idx = idx
-                    st.session_state["canvas_key"] += 1  # refresh canvas too
-                    st.rerun()
-            except Exception as e:
-                st.write(f"Error loading {img_path}")
+    selected_idx = render_review_queue(
+        image_files,
+        get_review_index(),
+        get_thumbnail_cache(thumb_size),
+        per_page=IMAGES_PER_PAGE,
+        grid=3  # 3 images per row
+    )
+    if selected_idx is not None:
+        st.session_state.current_idx = selected_idx
+        st.session_state["canvas_key"] = st.session_state.get("canvas_key", 0) + 1  # refresh canvas too
+        st.rerun()
 
 # Column 2: Annotation canvas
 with col2:
     selected_image_path = image_files[st.session_state.current_idx]
     selected_image_name = os.path.basename(selected_image_path)
     try:
-        image = Image.open(selected_image_path)
-        img_width, img_height = image.size
-        st.session_state.img_width = img_width
-        st.session_state.img_height = img_height
+        # The canvas PNG-encodes its background on every mount, so it gets a display-sized
+        # rendition; boxes live in display pixels and are mapped back to native ones on save
+        native_w, native_h = native_size(selected_image_path)
+        img_width, img_height = display_size(native_w, native_h, st.session_state.canvas_zoom)
+        image, _, _ = get_frame_cache().get_image(selected_image_path, (img_width, img_height))
+        st.session_state.native_size = (native_w, native_h)
+        st.session_state.display_size = (img_width, img_height)
         canvas_objects = []
         label_path = os.path.join(false_neg_labels_dir, selected_image_name.replace('.jpg', '.txt'))
         if os.path.exists(label_path):
@@ -201,9 +240,13 @@ with col2:
                         box_id = f"Box {i+1}"
                         canvas_objects.append(create_box(x1, y1, x2, y2, box_id, is_original=True))
                         canvas_objects.append(create_text_label(x1 + 4, max(2, y1 - 14), box_id))
-        if 'canvas_objects' not in st.session_state or st.session_state.get('current_image_idx', -1) != st.session_state.current_idx:
+        # Reset on a new image, not a new index: switching the review queue keeps the index.
+        # A fresh canvas key drops the previous image's boxes from the component too.
+        canvas_image = (queue_name, selected_image_path)
+        if 'canvas_objects' not in st.session_state or st.session_state.get('canvas_image') != canvas_image:
             st.session_state['canvas_objects'] = canvas_objects
-            st.session_state['current_image_idx'] = st.session_state.current_idx
+            st.session_state['canvas_image'] = canvas_image
+            st.session_state['canvas_key'] = st.session_state.get('canvas_key', 0) + 1
         if 'canvas_key' not in st.session_state:
             st.session_state['canvas_key'] = 0
         drawing_mode = st.radio(
@@ -271,14 +314,14 @@ with col3:
             try:
                 new_annotations = []
                 yolo_lines = []
+                native_w, native_h = st.session_state.native_size
                 for i, obj in enumerate(updated_objects):
                     if obj["type"] == "rect":
-                        left, top = obj["left"], obj["top"]
-                        width, height = obj["width"], obj["height"]
-                        x_center = (left + width / 2) / st.session_state.img_width
-                        y_center = (top + height / 2) / st.session_state.img_height
-                        w_norm = width / st.session_state.img_width
-                        h_norm = height / st.session_state.img_height
+                        left, top, width, height = rect_to_native(obj, st.session_state.display_size, st.session_state.native_size)
+                        x_center = (left + width / 2) / native_w
+                        y_center = (top + height / 2) / native_h
+                        w_norm = width / native_w
+                        h_norm = height / native_h
                         class_id = label_options.index(st.session_state.get(f"label_{i}", "Person"))
                         yolo_lines.append(f"{class_id} {x_center:.6f} {y_center:.6f} {w_norm:.6f} {h_norm:.6f}\n")
                         new_annotations.append({
@@ -295,6 +338,7 @@ with col3:
                 with open(corrected_file, 'w') as f:
                     yaml.dump(yaml_data, f)
                 save_to_json(selected_image_path, updated_objects, labels_per_box)
+                get_review_index().mark(selected_image_path)
                 st.success("✅ Annotations saved successfully!")
             except Exception as e:
                 st.error(f"Error saving annotations: {str(e)}")
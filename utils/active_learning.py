@@ -0,0 +1,118 @@
+import os
+import hashlib
+import numpy as np
+
+from utils.prediction_cache import file_digest, weights_digest
+
+SCORE_CACHE_DIR = '.cache/active_learning'
+
+
+# Identifies one version of an image on disk (same idea as the thumbnail cache key)
+def image_key(image_path):
+    st = os.stat(image_path)
+    return f"{os.path.abspath(image_path)}|{st.st_mtime_ns}|{st.st_size}"
+
+
+# Per-image detection uncertainty from the box confidences of one image:
+#   entropy - mean binary entropy of the boxes, scaled to [0, 1]
+#   margin  - smallest distance of any box from the 0.5 decision boundary, scaled to [0, 1]
+# An image without boxes is treated as certain (entropy 0, margin 1).
+def detection_uncertainty(confs, eps=1e-9):
+    confs = np.clip(np.asarray(confs, dtype=np.float64), eps, 1 - eps)
+    if len(confs) == 0:
+        return 0.0, 1.0
+    entropy = -(confs * np.log(confs) + (1 - confs) * np.log(1 - confs)) / np.log(2)
+    margin = np.abs(2 * confs - 1)
+    return float(entropy.mean()), float(margin.min())
+
+
+def combine_uncertainty(entropy, margin, entropy_weight=0.5):
+    return entropy_weight * np.asarray(entropy) + (1 - entropy_weight) * (1 - np.asarray(margin))
+
+
+def l2_normalize(features, eps=1e-12):
+    features = np.asarray(features, dtype=np.float32)
+    return features / (np.linalg.norm(features, axis=1, keepdims=True) + eps)
+
+
+# Greedy k-center ordering, weighted by uncertainty: each step picks the image that is
+# both uncertain and far from everything already picked (or already labeled).
+# Returns the picked indices in order and the distance each had when it was picked.
+def kcenter_rank(features, weights, k, labeled_features=None):
+    n = len(features)
+    k = min(k, n)
+    min_dist = np.full(n, np.inf)
+    if labeled_features is not None:
+        for start in range(0, len(labeled_features), 64):
+            block = labeled_features[start:start + 64]
+            min_dist = np.minimum(min_dist, np.sqrt(((features[:, None, :] - block[None, :, :]) ** 2).sum(-1)).min(1))
+    picked, picked_dist = [], []
+    available = np.ones(n, dtype=bool)
+    for _ in range(k):
+        # Before anything is picked every distance is inf; fall back to uncertainty alone
+        dist = np.where(np.isinf(min_dist), 1.0, min_dist)
+        scale = dist[available].max() if available.any() else 1.0
+        score = np.where(available, (weights + 1e-3) * dist / (scale if scale > 0 else 1.0), -np.inf)
+        i = int(score.argmax())
+        picked.append(i)
+        picked_dist.append(float(min_dist[i]))
+        available[i] = False
+        min_dist = np.minimum(min_dist, np.sqrt(((features - features[i]) ** 2).sum(1)))
+    return picked, picked_dist
+
+
+# Entropy, margin, embedding and proposed boxes per image, stored per scoring setup
+# in .cache/active_learning/<version>.npz. The version covers the embedding weights,
+# the backend weights that proposed the boxes, conf and imgsz, the same inputs
+# prediction_cache keys on. Entries are keyed by image_key, so only new or changed
+# images need another forward pass; a retrained model gets its own file, so older
+# versions can simply be deleted.
+class ScoreCache:
+    def __init__(self, model_path, weights, conf, imgsz, cache_dir=SCORE_CACHE_DIR):
+        setup = [file_digest(model_path), weights_digest(weights), str(float(conf)), str(int(imgsz))]
+        self.model_version = hashlib.sha1('|'.join(setup).encode('utf-8')).hexdigest()[:16]
+        self.path = os.path.join(cache_dir, self.model_version + '.npz')
+        self.entries = {}
+        if os.path.exists(self.path):
+            with np.load(self.path, allow_pickle=False) as data:
+                offsets = data['box_offsets']
+                for i, key in enumerate(data['keys']):
+                    self.entries[str(key)] = {
+                        'entropy': float(data['entropy'][i]),
+                        'margin': float(data['margin'][i]),
+                        'embedding': data['embeddings'][i].astype(np.float32),
+                        'boxes': data['boxes'][offsets[i]:offsets[i + 1]]
+                    }
+
+    def get(self, image_path):
+        return self.entries.get(image_key(image_path))
+
+    def stale(self, image_paths):
+        return [p for p in image_paths if image_key(p) not in self.entries]
+
+    # boxes: (N, 6) array of class, x, y, w, h (normalized), confidence
+    def put(self, image_path, entropy, margin, embedding, boxes):
+        self.entries[image_key(image_path)] = {
+            'entropy': entropy,
+            'margin': margin,
+            'embedding': np.asarray(embedding, dtype=np.float32),
+            'boxes': np.asarray(boxes, dtype=np.float32).reshape(-1, 6)
+        }
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        keys = sorted(self.entries)
+        entries = [self.entries[k] for k in keys]
+        lengths = [len(e['boxes']) for e in entries]
+        dim = len(entries[0]['embedding']) if entries else 0
+        tmp_path = self.path + '.tmp.npz'
+        np.savez(
+            tmp_path,
+            keys=np.array(keys, dtype=str),
+            entropy=np.array([e['entropy'] for e in entries], dtype=np.float32),
+            margin=np.array([e['margin'] for e in entries], dtype=np.float32),
+            embeddings=np.array([e['embedding'] for e in entries], dtype=np.float16).reshape(-1, dim),
+            boxes=np.concatenate([e['boxes'] for e in entries]) if entries else np.zeros((0, 6), dtype=np.float32),
+            box_offsets=np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        )
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,143 @@
+import os
+import json
+import fcntl
+import datetime
+import threading
+from contextlib import contextmanager
+
+
+# Append-only store for the box edits made in the review apps.
+#
+# Every change appends one JSON line to `<snapshot>.log` instead of rewriting the
+# whole tracking file. Once the log grows past `compact_every` records it is
+# folded into the snapshot (same layout as the old box_changes.json) which is
+# replaced atomically, so a crash can never leave a half-written file behind.
+#
+# Both review apps journal to the same files from separate processes, so every read,
+# append and compaction also holds an flock on `<snapshot>.lock`; the per-image
+# digests used to skip unchanged writes are rebuilt whenever the files changed since
+# this process last wrote them.
+class AnnotationJournal:
+    def __init__(self, snapshot_path, compact_every=500):
+        self.snapshot_path = snapshot_path
+        self.log_path = os.path.splitext(snapshot_path)[0] + '.log'
+        self.lock_path = os.path.splitext(snapshot_path)[0] + '.lock'
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._digests = None
+        self._seen = None
+        self._log_records = 0
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.lock_path) or '.', exist_ok=True)
+            with open(self.lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # Identity of the files on disk, to notice writes made by another process
+    def _disk_state(self):
+        state = []
+        for path in (self.snapshot_path, self.log_path):
+            try:
+                st = os.stat(path)
+                state.append((st.st_ino, st.st_size, st.st_mtime_ns))
+            except FileNotFoundError:
+                state.append(None)
+        return tuple(state)
+
+    def _read_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return {}
+        with open(self.snapshot_path, 'r') as f:
+            return json.load(f)
+
+    def _read_log(self, repair=False):
+        entries = []
+        if not os.path.exists(self.log_path):
+            return entries
+        good_bytes = 0
+        with open(self.log_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Torn tail from an interrupted append — everything before it is intact
+                    break
+                good_bytes += len(line)
+        if repair and good_bytes < os.path.getsize(self.log_path):
+            # Cut the torn tail off so the next append starts on a clean line
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(good_bytes)
+        return entries
+
+    def _load_unlocked(self, repair=False):
+        tracking_data = self._read_snapshot()
+        entries = self._read_log(repair)
+        for entry in entries:
+            tracking_data[entry['image_path']] = entry
+        return tracking_data, len(entries)
+
+    # Rebuild the current {image_path: entry} view (snapshot + replayed log)
+    def load(self):
+        with self._locked():
+            tracking_data, _ = self._load_unlocked()
+        return tracking_data
+
+    def get(self, image_path):
+        return self.load().get(image_path)
+
+    # Append the boxes for one image. Returns False when nothing changed since
+    # the last write for that image, so Streamlit reruns cost no I/O.
+    def record(self, image_path, boxes):
+        digest = json.dumps(boxes, sort_keys=True)
+        with self._locked():
+            if self._digests is None or self._seen != self._disk_state():
+                tracking_data, self._log_records = self._load_unlocked(repair=True)
+                self._digests = {
+                    path: json.dumps(entry.get('boxes', []), sort_keys=True)
+                    for path, entry in tracking_data.items()
+                }
+            if self._digests.get(image_path) == digest:
+                return False
+            entry = {
+                'image_path': image_path,
+                'boxes': boxes,
+                'timestamp': str(datetime.datetime.now())
+            }
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self._digests[image_path] = digest
+            self._log_records += 1
+            if self._log_records >= self.compact_every:
+                self._compact_unlocked()
+            self._seen = self._disk_state()
+        return True
+
+    def _compact_unlocked(self):
+        tracking_data, _ = self._load_unlocked()
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(tracking_data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        # Replaying the log over the new snapshot is idempotent, so a crash
+        # before this removal only costs a redundant replay on the next load
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+        self._log_records = 0
+
+    # Fold the log into box_changes.json now (e.g. before handing it to another tool)
+    def compact(self):
+        with self._locked():
+            self._compact_unlocked()
+        return self.snapshot_path
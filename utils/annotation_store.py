@@ -0,0 +1,257 @@
+import os
+import json
+import sqlite3
+import datetime
+from contextlib import contextmanager
+import yaml
+
+STORE_NAME = 'annotations.db'
+# Labels every new project starts with; their order fixes the first class ids
+DEFAULT_LABELS = ("Animal", "Human", "Vehicle")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS labels (
+    name TEXT PRIMARY KEY,
+    class_id INTEGER NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS images (
+    image TEXT PRIMARY KEY,
+    revision INTEGER NOT NULL DEFAULT 0,
+    exported_revision INTEGER NOT NULL DEFAULT 0,
+    source TEXT NOT NULL DEFAULT 'manual',
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS boxes (
+    image TEXT NOT NULL REFERENCES images(image) ON DELETE CASCADE,
+    box_idx INTEGER NOT NULL,
+    label TEXT NOT NULL,
+    x REAL NOT NULL,
+    y REAL NOT NULL,
+    w REAL NOT NULL,
+    h REAL NOT NULL,
+    confidence REAL,
+    source TEXT NOT NULL DEFAULT 'manual',
+    PRIMARY KEY (image, box_idx)
+);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    image TEXT NOT NULL,
+    revision INTEGER NOT NULL,
+    boxes TEXT NOT NULL,
+    saved_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_by_image ON history(image, revision);
+CREATE INDEX IF NOT EXISTS images_to_export ON images(image) WHERE revision > exported_revision;
+"""
+
+
+def now():
+    return str(datetime.datetime.now())
+
+
+# Per-project annotation database (projects/<name>/annotations.db, SQLite in WAL mode).
+#
+# Boxes are stored normalized as YOLO x/y/w/h with their label name, plus a full
+# edit history per image. Saves are transactional and can be batched; the YOLO
+# .txt layout is an incremental export that only rewrites images whose revision
+# moved since the last export. YAML is an on-demand export.
+#
+# A box is a dict: {'label': str, 'bbox': [x, y, w, h], 'confidence': float|None, 'source': str}
+# Each image also records who saved it last: 'manual', 'import' or 'prelabel'.
+class AnnotationStore:
+    def __init__(self, project_dir, default_labels=DEFAULT_LABELS):
+        self.project_dir = project_dir
+        self.path = os.path.join(project_dir, STORE_NAME)
+        self.labels_dir = os.path.join(project_dir, 'labels')
+        is_new = not os.path.exists(self.path)
+        os.makedirs(project_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            columns = {r['name'] for r in conn.execute("PRAGMA table_info(images)")}
+            if 'source' not in columns:
+                conn.execute("ALTER TABLE images ADD COLUMN source TEXT NOT NULL DEFAULT 'manual'")
+        if is_new:
+            # Seed the class ids first so imported .txt files keep their meaning
+            self.add_labels(default_labels)
+            self.import_labels(self.labels_dir)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # --- Labels (stable class ids for export) ---
+
+    def labels(self):
+        with self._connect() as conn:
+            return [r['name'] for r in conn.execute("SELECT name FROM labels ORDER BY class_id")]
+
+    def add_labels(self, names):
+        with self._connect() as conn:
+            self._add_labels(conn, names)
+
+    def _add_labels(self, conn, names):
+        next_id = conn.execute("SELECT COALESCE(MAX(class_id) + 1, 0) FROM labels").fetchone()[0]
+        for name in names:
+            if conn.execute("SELECT 1 FROM labels WHERE name = ?", (name,)).fetchone() is None:
+                conn.execute("INSERT INTO labels (name, class_id) VALUES (?, ?)", (name, next_id))
+                next_id += 1
+
+    # --- Boxes ---
+
+    # Replace the boxes of several images in one transaction: {image: [box, ...]}
+    def save_many(self, boxes_by_image, source='manual'):
+        timestamp = now()
+        with self._connect() as conn:
+            self._add_labels(conn, [b['label'] for boxes in boxes_by_image.values() for b in boxes])
+            for image, boxes in boxes_by_image.items():
+                conn.execute(
+                    "INSERT INTO images (image, revision, source, updated_at) VALUES (?, 1, ?, ?) "
+                    "ON CONFLICT(image) DO UPDATE SET revision = revision + 1, "
+                    "source = excluded.source, updated_at = excluded.updated_at",
+                    (image, source, timestamp)
+                )
+                revision = conn.execute("SELECT revision FROM images WHERE image = ?", (image,)).fetchone()[0]
+                conn.execute("DELETE FROM boxes WHERE image = ?", (image,))
+                conn.executemany(
+                    "INSERT INTO boxes (image, box_idx, label, x, y, w, h, confidence, source) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (image, i, b['label'], *map(float, b['bbox']), b.get('confidence'), b.get('source', source))
+                        for i, b in enumerate(boxes)
+                    ]
+                )
+                conn.execute(
+                    "INSERT INTO history (image, revision, boxes, saved_at) VALUES (?, ?, ?, ?)",
+                    (image, revision, json.dumps(boxes), timestamp)
+                )
+
+    def save(self, image, boxes, source='manual'):
+        self.save_many({image: boxes}, source)
+
+    def get_boxes(self, image):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT label, x, y, w, h, confidence, source FROM boxes WHERE image = ? ORDER BY box_idx", (image,)
+            ).fetchall()
+        return [
+            {'label': r['label'], 'bbox': [r['x'], r['y'], r['w'], r['h']],
+             'confidence': r['confidence'], 'source': r['source']}
+            for r in rows
+        ]
+
+    # Bumped by every save of the image (0 if it was never saved); cheap enough to check
+    # per rerun whether a copy of its boxes held elsewhere is still current
+    def revision(self, image):
+        with self._connect() as conn:
+            row = conn.execute("SELECT revision FROM images WHERE image = ?", (image,)).fetchone()
+        return row['revision'] if row else 0
+
+    # Saved images, optionally only those last saved by the given sources
+    def annotated_images(self, sources=None):
+        with self._connect() as conn:
+            if sources is None:
+                rows = conn.execute("SELECT image FROM images ORDER BY image")
+            else:
+                sources = list(sources)
+                placeholders = ', '.join('?' * len(sources))
+                rows = conn.execute(f"SELECT image FROM images WHERE source IN ({placeholders}) ORDER BY image", sources)
+            return [r['image'] for r in rows]
+
+    def history(self, image):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT revision, boxes, saved_at FROM history WHERE image = ? ORDER BY revision", (image,)
+            ).fetchall()
+        return [{'revision': r['revision'], 'boxes': json.loads(r['boxes']), 'saved_at': r['saved_at']} for r in rows]
+
+    # --- Export ---
+
+    # Write YOLO .txt files for images changed since the last export (all of them with force=True)
+    def export_yolo(self, labels_dir=None, force=False):
+        labels_dir = labels_dir or self.labels_dir
+        os.makedirs(labels_dir, exist_ok=True)
+        with self._connect() as conn:
+            class_ids = {r['name']: r['class_id'] for r in conn.execute("SELECT name, class_id FROM labels")}
+            where = "" if force else "WHERE revision > exported_revision"
+            pending = conn.execute(f"SELECT image, revision FROM images {where}").fetchall()
+            for row in pending:
+                boxes = conn.execute(
+                    "SELECT label, x, y, w, h FROM boxes WHERE image = ? ORDER BY box_idx", (row['image'],)
+                ).fetchall()
+                label_path = os.path.join(labels_dir, os.path.splitext(row['image'])[0] + '.txt')
+                tmp_path = label_path + '.tmp'
+                with open(tmp_path, 'w') as f:
+                    f.writelines(
+                        f"{class_ids[b['label']]} {b['x']:.6f} {b['y']:.6f} {b['w']:.6f} {b['h']:.6f}\n" for b in boxes
+                    )
+                os.replace(tmp_path, label_path)
+                conn.execute(
+                    "UPDATE images SET exported_revision = ? WHERE image = ?", (row['revision'], row['image'])
+                )
+        return len(pending)
+
+    # Richer per-image YAML (label names, timestamps), written only when asked for
+    def export_yaml(self, labels_dir=None):
+        labels_dir = labels_dir or self.labels_dir
+        os.makedirs(labels_dir, exist_ok=True)
+        with self._connect() as conn:
+            images = conn.execute("SELECT image, updated_at FROM images").fetchall()
+        for row in images:
+            yaml_data = {
+                'image': os.path.join(self.project_dir, 'images', row['image']),
+                'annotations': [{'label': b['label'], 'bbox': b['bbox']} for b in self.get_boxes(row['image'])],
+                'timestamp': row['updated_at']
+            }
+            with open(os.path.join(labels_dir, os.path.splitext(row['image'])[0] + '.yaml'), 'w') as f:
+                yaml.dump(yaml_data, f)
+        return len(images)
+
+    # --- Migration ---
+
+    # Pull in label files written before the store existed. YAML files carry label
+    # names; bare .txt files are mapped through the store's class ids.
+    def import_labels(self, labels_dir):
+        if not os.path.isdir(labels_dir):
+            return 0
+        images_dir = os.path.join(self.project_dir, 'images')
+        image_names = {}
+        if os.path.isdir(images_dir):
+            image_names = {os.path.splitext(f)[0]: f for f in os.listdir(images_dir)}
+        names = self.labels()
+        imported = {}
+        for filename in sorted(os.listdir(labels_dir)):
+            stem, ext = os.path.splitext(filename)
+            image = image_names.get(stem, stem + '.jpg')
+            path = os.path.join(labels_dir, filename)
+            if ext == '.yaml':
+                with open(path, 'r') as f:
+                    data = yaml.safe_load(f) or {}
+                imported[image] = [
+                    {'label': a['label'], 'bbox': a['bbox'], 'source': 'import'}
+                    for a in data.get('annotations', [])
+                ]
+            elif ext == '.txt' and image not in imported and not os.path.exists(os.path.join(labels_dir, stem + '.yaml')):
+                boxes = []
+                with open(path, 'r') as f:
+                    for line in f:
+                        parts = line.split()
+                        if len(parts) >= 5:
+                            cls = int(float(parts[0]))
+                            label = names[cls] if cls < len(names) else f"class_{cls}"
+                            boxes.append({'label': label, 'bbox': [float(v) for v in parts[1:5]], 'source': 'import'})
+                imported[image] = boxes
+        if imported:
+            self.save_many(imported, source='import')
+            # The files on disk already reflect these revisions
+            with self._connect() as conn:
+                conn.execute("UPDATE images SET exported_revision = revision")
+        return len(imported)
@@ -0,0 +1,155 @@
+import os
+from contextlib import contextmanager
+import numpy as np
+import yaml
+
+from utils.box_ops import box_iou, xywh_to_xyxy, match_ground_truth
+from utils.prediction_cache import file_digest
+
+BACKENDS_FILE = 'model/backends.yaml'
+DEFAULT_BACKEND = 'pytorch'
+# Backend name -> ultralytics export arguments (dynamic so the scripts can keep batching)
+EXPORT_FORMATS = {
+    'onnx': {'format': 'onnx', 'dynamic': True},
+    'openvino': {'format': 'openvino', 'dynamic': True},
+    'openvino-int8': {'format': 'openvino', 'dynamic': True, 'int8': True}
+}
+
+
+# model/backends.yaml records every exported backend, the baseline it was exported
+# from and its parity result, plus the one switch every inference script reads:
+#   active: onnx
+#   backends:
+#     onnx: {path: model/baseline.onnx, source_sha1: ..., parity: {...}, passed: true}
+def load_registry(path=BACKENDS_FILE):
+    if not os.path.exists(path):
+        return {'active': DEFAULT_BACKEND, 'backends': {}}
+    with open(path, 'r') as f:
+        registry = yaml.safe_load(f) or {}
+    registry.setdefault('active', DEFAULT_BACKEND)
+    registry.setdefault('backends', {})
+    return registry
+
+
+def save_registry(registry, path=BACKENDS_FILE):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        yaml.dump(registry, f, sort_keys=False)
+    os.replace(tmp_path, path)
+
+
+# Weights to load for a backend. The INFERENCE_BACKEND environment variable overrides the
+# registry's 'active' entry. A backend that failed parity, is missing, was exported from
+# an older baseline, or was checked at a different imgsz than requested falls back to PyTorch.
+def resolve_backend(model_path='model/baseline.pt', backend=None, registry_path=BACKENDS_FILE, imgsz=None):
+    registry = load_registry(registry_path)
+    name = backend or os.environ.get('INFERENCE_BACKEND') or registry['active']
+    if name == DEFAULT_BACKEND:
+        return name, model_path
+    entry = registry['backends'].get(name)
+    if entry is None:
+        print(f"⚠️ Backend '{name}' has not been exported; using PyTorch.")
+    elif not entry.get('passed'):
+        print(f"⚠️ Backend '{name}' failed its parity check; using PyTorch.")
+    elif not os.path.exists(entry['path']):
+        print(f"⚠️ Backend '{name}' weights {entry['path']} are missing; using PyTorch.")
+    elif entry.get('source_sha1') != file_digest(model_path):
+        print(f"⚠️ Backend '{name}' was exported from an older {model_path}; re-export it. Using PyTorch.")
+    elif imgsz is not None and entry.get('imgsz', imgsz) != imgsz:
+        print(f"⚠️ Backend '{name}' passed parity at imgsz {entry['imgsz']}, not {imgsz}; using PyTorch.")
+    else:
+        return name, entry['path']
+    return DEFAULT_BACKEND, model_path
+
+
+# While active, ONNX Runtime sessions and OpenVINO CPU models are created with `threads`
+# intra-op threads (torch.set_num_threads does not reach either runtime). Patches the
+# runtimes' entry points rather than ultralytics internals, which differ between versions.
+@contextmanager
+def runtime_threads(threads):
+    restore = []
+    try:
+        import onnxruntime
+    except ImportError:
+        onnxruntime = None
+    if onnxruntime is not None:
+        session_class = onnxruntime.InferenceSession
+
+        class ThreadedSession(session_class):
+            def __init__(self, path_or_bytes, sess_options=None, *args, **kwargs):
+                sess_options = sess_options or onnxruntime.SessionOptions()
+                sess_options.intra_op_num_threads = threads
+                super().__init__(path_or_bytes, sess_options, *args, **kwargs)
+        onnxruntime.InferenceSession = ThreadedSession
+        restore.append((onnxruntime, 'InferenceSession', session_class))
+    try:
+        import openvino
+    except ImportError:
+        openvino = None
+    if openvino is not None:
+        compile_model = openvino.Core.compile_model
+
+        def threaded_compile_model(core, *args, **kwargs):
+            core.set_property('CPU', {'INFERENCE_NUM_THREADS': threads})
+            return compile_model(core, *args, **kwargs)
+        openvino.Core.compile_model = threaded_compile_model
+        restore.append((openvino.Core, 'compile_model', compile_model))
+    try:
+        yield
+    finally:
+        for owner, attr, original in restore:
+            setattr(owner, attr, original)
+
+
+# (model, weights path) for the configured backend; the path doubles as the
+# prediction cache's weights identity. imgsz is the size the caller predicts at (an
+# exported backend is only used at the imgsz it passed parity for). threads sets the
+# intra-op thread count of whichever runtime ends up running the model.
+def load_model(model_path='model/baseline.pt', backend=None, imgsz=640, threads=None):
+    from ultralytics import YOLO
+    name, weights = resolve_backend(model_path, backend, imgsz=imgsz)
+    if name != DEFAULT_BACKEND:
+        print(f"Using {name} backend ({weights})")
+    model = YOLO(weights, task='detect')
+    if threads is not None:
+        import torch
+        torch.set_num_threads(threads)
+        if name != DEFAULT_BACKEND:
+            # Exported models build their runtime session on the first predict; do it now
+            with runtime_threads(threads):
+                size = imgsz or 640
+                model.predict(np.zeros((size, size, 3), dtype=np.uint8), imgsz=size, verbose=False)
+    return model, weights
+
+
+# Box-level agreement between two lists of Detections for the same images:
+#   match_rate - share of boxes on either side with a same-class box at IoU >= iou_thr
+#   conf_diff  - mean/max absolute confidence difference over matched pairs
+def parity_report(reference, candidate, iou_thr=0.8):
+    ref = [r.data[:, :5] for r in reference]
+    cand = [c.data[:, :5] for c in candidate]
+    ref_missed, _ = match_ground_truth(ref, cand, iou_thr=iou_thr)
+    cand_missed, _ = match_ground_truth(cand, ref, iou_thr=iou_thr)
+    n_ref = sum(len(r) for r in ref)
+    n_cand = sum(len(c) for c in cand)
+    unmatched = sum(int(m.sum()) for m in ref_missed) + sum(int(m.sum()) for m in cand_missed)
+
+    conf_diffs = []
+    for r, c in zip(reference, candidate):
+        if len(r) == 0 or len(c) == 0:
+            continue
+        iou = box_iou(xywh_to_xyxy(r.xywhn), xywh_to_xyxy(c.xywhn))
+        iou = np.where(r.cls[:, None] == c.cls[None, :], iou, 0.0)
+        best = iou.argmax(1)
+        matched = iou[np.arange(len(r)), best] >= iou_thr
+        conf_diffs.extend(np.abs(r.conf[matched] - c.conf[best[matched]]).tolist())
+
+    total = n_ref + n_cand
+    return {
+        'images': len(reference),
+        'reference_boxes': n_ref,
+        'candidate_boxes': n_cand,
+        'match_rate': round(1.0 - unmatched / total, 4) if total else 1.0,
+        'conf_diff_mean': round(float(np.mean(conf_diffs)), 4) if conf_diffs else 0.0,
+        'conf_diff_max': round(float(np.max(conf_diffs)), 4) if conf_diffs else 0.0
+    }
@@ -0,0 +1,78 @@
+import os
+import numpy as np
+
+
+# Read a YOLO label file into an (N, 5) float32 array of [class, x, y, w, h] (normalized).
+# Missing files give None so callers can tell "no labels" from "labelled as empty".
+def load_yolo_labels(label_path):
+    if not os.path.exists(label_path):
+        return None
+    rows = []
+    with open(label_path, 'r') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 5:
+                rows.append([float(v) for v in parts[:5]])
+    return np.array(rows, dtype=np.float32).reshape(-1, 5)
+
+
+# YOLO label next to an image: .../images/x.jpg -> .../labels/x.txt, else <labels_dir>/x.txt
+def label_path_for(image_path, labels_dir=None):
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    parent = os.path.dirname(image_path)
+    if os.path.basename(parent) == 'images':
+        sibling = os.path.join(os.path.dirname(parent), 'labels', stem + '.txt')
+        if os.path.exists(sibling) or labels_dir is None:
+            return sibling
+    return os.path.join(labels_dir or parent, stem + '.txt')
+
+
+def xywh_to_xyxy(boxes):
+    boxes = np.asarray(boxes, dtype=np.float32)
+    half = boxes[..., 2:4] / 2
+    return np.concatenate([boxes[..., 0:2] - half, boxes[..., 0:2] + half], axis=-1)
+
+
+# Stack ragged per-image arrays into one (B, M, C) array plus a (B, M) validity mask
+def pad_batch(arrays, width):
+    size = max((len(a) for a in arrays), default=0)
+    out = np.zeros((len(arrays), size, width), dtype=np.float32)
+    mask = np.zeros((len(arrays), size), dtype=bool)
+    for i, a in enumerate(arrays):
+        out[i, :len(a)] = a
+        mask[i, :len(a)] = True
+    return out, mask
+
+
+# Pairwise IoU between every box in a and every box in b (xyxy, any leading batch dims):
+# (..., N, 4) x (..., M, 4) -> (..., N, M)
+def box_iou(a, b, eps=1e-9):
+    a = a[..., :, None, :]
+    b = b[..., None, :, :]
+    inter_wh = np.clip(np.minimum(a[..., 2:], b[..., 2:]) - np.maximum(a[..., :2], b[..., :2]), 0, None)
+    inter = inter_wh[..., 0] * inter_wh[..., 1]
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / (area_a + area_b - inter + eps)
+
+
+# For a batch of images, find ground-truth objects no prediction of the same class
+# overlaps by at least iou_thr.
+#   gts:   list of (G_i, 5) arrays [class, x, y, w, h] (normalized)
+#   preds: list of (P_i, 5) arrays [class, x, y, w, h] (normalized)
+# Returns (missed, best_iou): per-image boolean arrays over that image's GT rows and
+# the best same-class IoU each GT object reached.
+def match_ground_truth(gts, preds, iou_thr=0.5, class_aware=True):
+    gt, gt_mask = pad_batch(gts, 5)
+    pred, pred_mask = pad_batch(preds, 5)
+    iou = box_iou(xywh_to_xyxy(gt[..., 1:]), xywh_to_xyxy(pred[..., 1:]))
+    valid = gt_mask[:, :, None] & pred_mask[:, None, :]
+    if class_aware:
+        valid &= gt[:, :, None, 0] == pred[:, None, :, 0]
+    iou = np.where(valid, iou, 0.0)
+    best = iou.max(axis=2) if iou.shape[2] else np.zeros(gt_mask.shape, dtype=np.float32)
+    missed = (best < iou_thr) & gt_mask
+    return (
+        [missed[i, :len(g)] for i, g in enumerate(gts)],
+        [best[i, :len(g)] for i, g in enumerate(gts)]
+    )
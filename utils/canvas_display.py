@@ -0,0 +1,45 @@
+from PIL import Image
+
+# Zoom steps offered next to the canvas; 1.0 fits the frame to DISPLAY_WIDTH
+ZOOM_LEVELS = (0.5, 0.75, 1.0, 1.25, 1.5)
+DISPLAY_WIDTH = 640
+
+
+# Native (width, height) from the image header, without decoding the pixels
+def native_size(image_path):
+    with Image.open(image_path) as image:
+        return image.size
+
+
+# Canvas size for a frame at a zoom level. Frames wider than DISPLAY_WIDTH are shrunk to
+# it at zoom 1.0; smaller ones are shown at their native size.
+def display_size(width, height, zoom=1.0, display_width=DISPLAY_WIDTH):
+    scale = min(1.0, display_width / width) * zoom
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+# Multiply the geometry of canvas objects by (fx, fy), e.g. when the zoom changes.
+# Fabric keeps a user's resize in scaleX/scaleY, so that is folded into width/height.
+def rescale_objects(objects, fx, fy):
+    scaled = []
+    for obj in objects:
+        obj = dict(obj)
+        obj['left'] = obj['left'] * fx
+        obj['top'] = obj['top'] * fy
+        if obj['type'] == 'rect':
+            obj['width'] = obj['width'] * obj.get('scaleX', 1) * fx
+            obj['height'] = obj['height'] * obj.get('scaleY', 1) * fy
+            obj['scaleX'] = obj['scaleY'] = 1
+        scaled.append(obj)
+    return scaled
+
+
+# Native-pixel left, top, width, height of a canvas rect drawn on a display_size canvas
+def rect_to_native(obj, display, native):
+    fx, fy = native[0] / display[0], native[1] / display[1]
+    return (
+        obj['left'] * fx,
+        obj['top'] * fy,
+        obj['width'] * obj.get('scaleX', 1) * fx,
+        obj['height'] * obj.get('scaleY', 1) * fy
+    )
@@ -0,0 +1,165 @@
+import os
+import sqlite3
+import datetime
+from contextlib import contextmanager
+from PIL import Image
+
+CATALOG_PATH = 'projects/.catalog.db'
+SUPPORTED_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    name TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    last_activity TEXT NOT NULL,
+    image_count INTEGER NOT NULL DEFAULT 0,
+    labeled_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS images (
+    project TEXT NOT NULL REFERENCES projects(name) ON DELETE CASCADE,
+    filename TEXT NOT NULL,
+    sha256 TEXT,
+    width INTEGER,
+    height INTEGER,
+    status TEXT NOT NULL DEFAULT 'unlabeled',
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (project, filename)
+);
+CREATE INDEX IF NOT EXISTS images_by_hash ON images(project, sha256);
+CREATE INDEX IF NOT EXISTS images_by_status ON images(project, status);
+
+-- Per-project counters are kept up to date here so the Home page never has to count rows
+CREATE TRIGGER IF NOT EXISTS images_added AFTER INSERT ON images BEGIN
+    UPDATE projects SET
+        image_count = image_count + 1,
+        labeled_count = labeled_count + (NEW.status = 'labeled'),
+        last_activity = NEW.updated_at
+    WHERE name = NEW.project;
+END;
+CREATE TRIGGER IF NOT EXISTS images_removed AFTER DELETE ON images BEGIN
+    UPDATE projects SET
+        image_count = image_count - 1,
+        labeled_count = labeled_count - (OLD.status = 'labeled')
+    WHERE name = OLD.project;
+END;
+CREATE TRIGGER IF NOT EXISTS images_updated AFTER UPDATE OF status, updated_at ON images BEGIN
+    UPDATE projects SET
+        labeled_count = labeled_count + (NEW.status = 'labeled') - (OLD.status = 'labeled'),
+        last_activity = NEW.updated_at
+    WHERE name = NEW.project;
+END;
+"""
+
+
+def now():
+    return str(datetime.datetime.now())
+
+
+# Local SQLite catalog of projects, their images and annotation status.
+# A short-lived connection per call keeps it safe to use from any Streamlit thread.
+class Catalog:
+    def __init__(self, path=CATALOG_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def ensure_project(self, name):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO projects (name, created_at, last_activity) VALUES (?, ?, ?)",
+                (name, now(), now())
+            )
+
+    def has_project(self, name):
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM projects WHERE name = ?", (name,)).fetchone() is not None
+
+    # rows: iterable of dicts with filename and optionally sha256, width, height
+    def add_images(self, project, rows):
+        self.ensure_project(project)
+        timestamp = now()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO images (project, filename, sha256, width, height, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(project, r['filename'], r.get('sha256'), r.get('width'), r.get('height'), timestamp) for r in rows]
+            )
+
+    def remove_images(self, project, filenames):
+        with self._connect() as conn:
+            conn.executemany(
+                "DELETE FROM images WHERE project = ? AND filename = ?",
+                [(project, f) for f in filenames]
+            )
+
+    def set_status(self, project, filename, status):
+        self.set_status_many(project, [filename], status)
+
+    def set_status_many(self, project, filenames, status):
+        filenames = list(filenames)
+        timestamp = now()
+        self.ensure_project(project)
+        with self._connect() as conn:
+            # Images saved before they were ever catalogued get their row on the fly
+            conn.executemany(
+                "INSERT OR IGNORE INTO images (project, filename, updated_at) VALUES (?, ?, ?)",
+                [(project, f, timestamp) for f in filenames]
+            )
+            conn.executemany(
+                "UPDATE images SET status = ?, updated_at = ? WHERE project = ? AND filename = ?",
+                [(status, timestamp, project, f) for f in filenames]
+            )
+
+    def status_counts(self, project):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) AS n FROM images WHERE project = ? GROUP BY status", (project,)
+            ).fetchall()
+        return {r['status']: r['n'] for r in rows}
+
+    def project_summaries(self):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT name, image_count, labeled_count, created_at, last_activity FROM projects ORDER BY name"
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    # Bring a project's rows in line with what is on disk. Only needed for projects
+    # created before the catalog existed, or after files were changed by hand.
+    def sync_project(self, name, project_root='projects'):
+        self.ensure_project(name)
+        images_dir = os.path.join(project_root, name, 'images')
+        labels_dir = os.path.join(project_root, name, 'labels')
+        on_disk = set()
+        if os.path.isdir(images_dir):
+            on_disk = {f for f in os.listdir(images_dir) if f.lower().endswith(SUPPORTED_EXTS)}
+        with self._connect() as conn:
+            known = {r['filename'] for r in conn.execute("SELECT filename FROM images WHERE project = ?", (name,))}
+        new_rows = []
+        for filename in sorted(on_disk - known):
+            row = {'filename': filename}
+            try:
+                # Opening reads only the header, not the pixels
+                with Image.open(os.path.join(images_dir, filename)) as img:
+                    row['width'], row['height'] = img.size
+            except Exception:
+                pass
+            new_rows.append(row)
+        self.add_images(name, new_rows)
+        self.remove_images(name, known - on_disk)
+        if os.path.isdir(labels_dir):
+            labeled = {os.path.splitext(f)[0] for f in os.listdir(labels_dir) if f.endswith('.txt')}
+            self.set_status_many(name, [f for f in on_disk if os.path.splitext(f)[0] in labeled], 'labeled')
@@ -0,0 +1,198 @@
+import os
+import json
+import sqlite3
+from contextlib import contextmanager
+from multiprocessing import Pool
+import numpy as np
+from PIL import Image
+
+from utils.box_ops import box_iou, xywh_to_xyxy
+from utils.prediction_cache import file_digest
+from utils.label_index import IMAGE_EXTS
+
+LINT_CACHE_PATH = '.cache/lint.db'
+# Bumped whenever a check changes, so cached results from older rules are not reused
+LINT_VERSION = 1
+# Box corners may stick out of the frame by this much (normalized) before it is an error
+EDGE_TOLERANCE = 0.01
+# Boxes smaller than this (normalized area) count as zero-area
+MIN_AREA = 1e-6
+# Same-class boxes overlapping at least this much are reported as duplicates
+DUPLICATE_IOU = 0.9
+# Issue codes that do not make a split unusable; everything else is an error
+WARNINGS = ('orphan_image',)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    path TEXT PRIMARY KEY,
+    context TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha1 TEXT NOT NULL,
+    issues TEXT NOT NULL
+);
+"""
+
+
+def issue(code, message, line=None):
+    return {'code': code, 'line': line, 'message': message}
+
+
+# Problems in one YOLO label file: malformed lines, class ids outside names,
+# out-of-range or zero-area boxes, and duplicate boxes
+def lint_label(label_path, nc):
+    issues, rows, line_nos = [], [], []
+    with open(label_path, 'r') as f:
+        lines = f.readlines()
+    for n, line in enumerate(lines, 1):
+        parts = line.split()
+        if not parts:
+            continue
+        if len(parts) != 5:
+            issues.append(issue('malformed', f"expected 5 values, got {len(parts)}", n))
+            continue
+        try:
+            values = [float(v) for v in parts]
+        except ValueError:
+            issues.append(issue('malformed', f"non-numeric value in '{line.strip()}'", n))
+            continue
+        cls, x, y, w, h = values
+        if not cls.is_integer() or not 0 <= cls < nc:
+            issues.append(issue('class_id', f"class id {parts[0]} not in names (0..{nc - 1})", n))
+            continue
+        if not all(np.isfinite(values)):
+            issues.append(issue('malformed', "non-finite value", n))
+            continue
+        if w <= 0 or h <= 0 or w * h < MIN_AREA:
+            issues.append(issue('zero_area', f"box {w:g}x{h:g} has no area", n))
+            continue
+        lo, hi = -EDGE_TOLERANCE, 1 + EDGE_TOLERANCE
+        if not (0 <= x <= 1 and 0 <= y <= 1) or x - w / 2 < lo or y - h / 2 < lo or x + w / 2 > hi or y + h / 2 > hi:
+            issues.append(issue('out_of_range', f"box {x:g} {y:g} {w:g} {h:g} leaves the image", n))
+            continue
+        rows.append(values)
+        line_nos.append(n)
+
+    if len(rows) > 1:
+        boxes = np.array(rows, dtype=np.float32)
+        iou = box_iou(xywh_to_xyxy(boxes[:, 1:]), xywh_to_xyxy(boxes[:, 1:]))
+        same = (iou >= DUPLICATE_IOU) & (boxes[:, None, 0] == boxes[None, :, 0])
+        # Report each box that repeats an earlier one
+        for j, i in zip(*np.nonzero(np.tril(same, -1))):
+            issues.append(issue('duplicate', f"repeats the box on line {line_nos[i]} (IoU {iou[j, i]:.2f})", line_nos[j]))
+    return issues
+
+
+# Fully decode an image; truncated or corrupt files raise here
+def lint_image(image_path):
+    try:
+        with Image.open(image_path) as image:
+            image.load()
+            if image.width == 0 or image.height == 0:
+                return [issue('unreadable', "image has no pixels")]
+    except Exception as e:
+        return [issue('unreadable', str(e))]
+    return []
+
+
+# Worker: (kind, path, nc, known sha1) -> (path, sha1, issues or None when the
+# content matches the known hash and the cached result still holds)
+def lint_file(task):
+    kind, path, nc, known_sha1 = task
+    sha1 = file_digest(path)
+    if sha1 == known_sha1:
+        return path, sha1, None
+    return path, sha1, lint_image(path) if kind == 'image' else lint_label(path, nc)
+
+
+# Lint results per file, reused while the file's mtime and size (or failing that, its
+# content hash) and the check context (rule version, class names) stay the same
+class LintCache:
+    def __init__(self, path=LINT_CACHE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def lookup(self, paths):
+        with self._connect() as conn:
+            rows = {}
+            for path in paths:
+                row = conn.execute("SELECT * FROM results WHERE path = ?", (os.path.abspath(path),)).fetchone()
+                if row is not None:
+                    rows[path] = row
+            return rows
+
+    def store(self, entries):
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO results (path, context, mtime_ns, size, sha1, issues) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (os.path.abspath(path), context, st.st_mtime_ns, st.st_size, sha1, json.dumps(issues))
+                    for path, context, st, sha1, issues in entries
+                ]
+            )
+
+
+def list_files(folder, exts):
+    if not os.path.isdir(folder):
+        return {}
+    return {os.path.splitext(f)[0]: os.path.join(folder, f) for f in sorted(os.listdir(folder)) if f.lower().endswith(exts)}
+
+
+# Lint one split folder (images/ + labels/). Per-file checks run in a process pool and
+# only for files the cache cannot vouch for; orphans are found from the listings.
+# Returns ({path: [issue, ...]} for every file with problems, files checked, files seen).
+def lint_split(split_dir, names, cache=None, workers=4, chunksize=32):
+    images = list_files(os.path.join(split_dir, 'images'), IMAGE_EXTS)
+    labels = list_files(os.path.join(split_dir, 'labels'), ('.txt',))
+    nc = len(names)
+    label_context = f"v{LINT_VERSION}:label:{json.dumps(list(names))}"
+    image_context = f"v{LINT_VERSION}:image"
+    files = [('image', p, image_context) for p in images.values()] + [('label', p, label_context) for p in labels.values()]
+
+    known = cache.lookup([p for _, p, _ in files]) if cache is not None else {}
+    stats = {p: os.stat(p) for _, p, _ in files}
+    results, tasks, contexts = {}, [], {}
+    for kind, path, context in files:
+        row = known.get(path)
+        valid = row is not None and row['context'] == context
+        if valid and row['mtime_ns'] == stats[path].st_mtime_ns and row['size'] == stats[path].st_size:
+            results[path] = json.loads(row['issues'])
+            continue
+        tasks.append((kind, path, nc, row['sha1'] if valid else None))
+        contexts[path] = (context, known.get(path))
+
+    if workers > 1 and len(tasks) > chunksize:
+        with Pool(workers) as pool:
+            checked = pool.map(lint_file, tasks, chunksize=chunksize)
+    else:
+        checked = [lint_file(task) for task in tasks]
+
+    fresh = []
+    for path, sha1, issues in checked:
+        context, row = contexts[path]
+        if issues is None:
+            # Touched but unchanged: keep the cached result under the new mtime
+            issues = json.loads(row['issues'])
+        results[path] = issues
+        fresh.append((path, context, stats[path], sha1, issues))
+    if cache is not None and fresh:
+        cache.store(fresh)
+
+    for stem in sorted(labels.keys() - images.keys()):
+        results.setdefault(labels[stem], []).append(issue('orphan_label', "no image with this name"))
+    for stem in sorted(images.keys() - labels.keys()):
+        results.setdefault(images[stem], []).append(issue('orphan_image', "no label file (trained as background)"))
+    return {path: issues for path, issues in sorted(results.items()) if issues}, len(tasks), len(files)
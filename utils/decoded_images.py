@@ -0,0 +1,239 @@
+import os
+import json
+import math
+import glob
+import hashlib
+from multiprocessing import Pool
+import cv2
+import numpy as np
+
+DECODED_DIR = '.cache/decoded'
+FRAMES_FILE = 'frames.u8'
+INDEX_FILE = 'index.json'
+
+
+# Where the frames of one image folder at one imgsz live
+def decoded_dir(source_dir, imgsz):
+    source_dir = os.path.abspath(source_dir)
+    key = hashlib.sha1(source_dir.encode('utf-8')).hexdigest()[:12]
+    parent = os.path.basename(os.path.dirname(source_dir))
+    return os.path.join(DECODED_DIR, f"{parent}_{os.path.basename(source_dir)}_{key}_{imgsz}")
+
+
+# Resize the way ultralytics' load_image does: long side = imgsz, aspect kept, no
+# padding (training and predict both add their own)
+def resize_for_imgsz(image, imgsz):
+    h0, w0 = image.shape[:2]
+    r = imgsz / max(h0, w0)
+    if r != 1:
+        size = (min(math.ceil(w0 * r), imgsz), min(math.ceil(h0 * r), imgsz))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_LINEAR if r > 1 else cv2.INTER_AREA)
+    return image
+
+
+# Decode and resize one image for the frame file. Grayscale frames, including 3-channel
+# JPEGs whose channels are identical, keep a single channel.
+def decode_frame(task):
+    path, imgsz = task
+    image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if image is None:
+        return path, None, None
+    if image.ndim == 3 and image.shape[2] == 4:
+        image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+    if image.ndim == 3 and np.array_equal(image[..., 0], image[..., 1]) and np.array_equal(image[..., 0], image[..., 2]):
+        image = image[..., 0]
+    orig_shape = image.shape[:2]
+    image = resize_for_imgsz(image, imgsz)
+    return path, np.ascontiguousarray(image.reshape(image.shape[0], image.shape[1], -1)), orig_shape
+
+
+def load_index(cache_dir):
+    path = os.path.join(cache_dir, INDEX_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+# Pre-decode every image in source_dir into cache_dir/frames.u8, one flat uint8 file,
+# with index.json mapping each image to its offset and shape. New or changed images are
+# decoded in a process pool and appended; entries of removed images are dropped, and
+# rebuild=True rewrites the file without the space they left behind. A rewrite goes to
+# a new file that replaces the old one, so processes still mapping it are unaffected.
+def build(source_dir, imgsz=640, workers=4, rebuild=False, exts=('.jpg', '.jpeg', '.png', '.bmp')):
+    cache_dir = decoded_dir(source_dir, imgsz)
+    os.makedirs(cache_dir, exist_ok=True)
+    frames_path = os.path.join(cache_dir, FRAMES_FILE)
+    write_path = frames_path
+    index = None if rebuild else load_index(cache_dir)
+    if index is None or not os.path.exists(frames_path):
+        index = {'imgsz': imgsz, 'source': os.path.abspath(source_dir), 'frames': {}}
+        write_path = frames_path + '.tmp'
+        open(write_path, 'wb').close()
+
+    paths = sorted(
+        os.path.abspath(os.path.join(source_dir, f)) for f in os.listdir(source_dir) if f.lower().endswith(exts)
+    )
+    stats = {p: os.stat(p) for p in paths}
+    entries = index['frames']
+    for path in list(entries):
+        if path not in stats:
+            del entries[path]
+    stale = [
+        p for p in paths
+        if p not in entries or entries[p]['mtime_ns'] != stats[p].st_mtime_ns or entries[p]['size'] != stats[p].st_size
+    ]
+
+    failed = []
+    if stale:
+        tasks = [(p, imgsz) for p in stale]
+        pool = Pool(workers) if workers > 1 and len(tasks) > 1 else None
+        try:
+            decoded = pool.imap(decode_frame, tasks, chunksize=16) if pool else map(decode_frame, tasks)
+            with open(write_path, 'ab') as f:
+                for path, image, orig_shape in decoded:
+                    if image is None:
+                        failed.append(path)
+                        continue
+                    entries[path] = {
+                        'offset': f.tell(),
+                        'shape': list(image.shape),
+                        'orig_shape': list(orig_shape),
+                        'mtime_ns': stats[path].st_mtime_ns,
+                        'size': stats[path].st_size
+                    }
+                    f.write(image.tobytes())
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+    if write_path != frames_path:
+        os.replace(write_path, frames_path)
+    tmp_path = os.path.join(cache_dir, INDEX_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f)
+    os.replace(tmp_path, os.path.join(cache_dir, INDEX_FILE))
+    live = sum(int(np.prod(e['shape'])) for e in entries.values())
+    return {
+        'cache_dir': cache_dir,
+        'images': len(entries),
+        'decoded': len(stale) - len(failed),
+        'failed': failed,
+        'bytes': os.path.getsize(frames_path),
+        'dead_bytes': os.path.getsize(frames_path) - live
+    }
+
+
+# Read side: every folder pre-decoded at imgsz, looked up by absolute image path.
+# Frames are slices of a read-only memory map, so workers share the page cache and
+# nothing is decoded. An image that changed since it was decoded is reported as absent,
+# and callers fall back to reading the file. Picklable (maps are reopened on demand), so
+# it can travel into DataLoader workers.
+class DecodedImages:
+    def __init__(self, imgsz=640, root=DECODED_DIR):
+        self.imgsz = imgsz
+        self.root = root
+        self._entries = {}
+        self._maps = {}
+        for cache_dir in sorted(glob.glob(os.path.join(root, f"*_{imgsz}"))):
+            index = load_index(cache_dir)
+            if index is None or index.get('imgsz') != imgsz:
+                continue
+            for path, entry in index['frames'].items():
+                self._entries[path] = (cache_dir, entry)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_maps'] = {}
+        return state
+
+    def entry(self, image_path):
+        found = self._entries.get(os.path.abspath(image_path))
+        if found is None:
+            return None
+        st = os.stat(image_path)
+        if found[1]['mtime_ns'] != st.st_mtime_ns or found[1]['size'] != st.st_size:
+            return None
+        return found
+
+    def __contains__(self, image_path):
+        return self.entry(image_path) is not None
+
+    # (H, W, C) uint8 view of the stored frame, C = 1 for grayscale; None when absent
+    def get(self, image_path):
+        found = self.entry(image_path)
+        if found is None:
+            return None
+        cache_dir, entry = found
+        frames = self._maps.get(cache_dir)
+        if frames is None:
+            frames = self._maps[cache_dir] = np.memmap(os.path.join(cache_dir, FRAMES_FILE), dtype=np.uint8, mode='r')
+        size = int(np.prod(entry['shape']))
+        return frames[entry['offset']:entry['offset'] + size].reshape(entry['shape'])
+
+    # 3-channel BGR copy for the model (ultralytics expects what cv2.imread returns)
+    def bgr(self, image_path):
+        frame = self.get(image_path)
+        if frame is None:
+            return None
+        if frame.shape[2] == 1:
+            return np.repeat(np.asarray(frame), 3, axis=2)
+        return np.array(frame)
+
+    def orig_shape(self, image_path):
+        return tuple(self.entry(image_path)[1]['orig_shape'])
+
+    # (BGR frame, original (h, w)) for a dataset at imgsz, or None when not stored
+    def load(self, image_path, imgsz):
+        if imgsz != self.imgsz:
+            return None
+        image = self.bgr(image_path)
+        if image is None:
+            return None
+        return image, self.orig_shape(image_path)
+
+    # Point an ultralytics dataset's load_image at the stored frames
+    def attach(self, dataset):
+        dataset.load_image = DecodedLoader(self, dataset.load_image, dataset)
+        return dataset
+
+
+# Stand-in for BaseDataset.load_image that takes images from `source` (anything with
+# load(path, imgsz) -> (BGR image resized for imgsz, original (h, w)) or None) and
+# falls back to the original loader. Like the original, images loaded for augmentation
+# go into the dataset's buffer, which mosaic draws its extra images from.
+class DecodedLoader:
+    def __init__(self, source, fallback, dataset):
+        self.source = source
+        self.fallback = fallback
+        self.dataset = dataset
+
+    def __call__(self, i, rect_mode=True):
+        dataset = self.dataset
+        if dataset.ims[i] is not None:
+            return dataset.ims[i], dataset.im_hw0[i], dataset.im_hw[i]
+        loaded = self.source.load(dataset.im_files[i], dataset.imgsz) if rect_mode else None
+        if loaded is None:
+            return self.fallback(i, rect_mode)
+        image, orig_shape = loaded
+        if dataset.augment:
+            dataset.ims[i], dataset.im_hw0[i], dataset.im_hw[i] = image, orig_shape, image.shape[:2]
+            dataset.buffer.append(i)
+            if len(dataset.buffer) >= dataset.max_buffer_length:
+                j = dataset.buffer.pop(0)
+                dataset.ims[j], dataset.im_hw0[j], dataset.im_hw[j] = None, None, None
+        return image, orig_shape, image.shape[:2]
+
+
+# Detection trainer class whose datasets read stored frames, for model.train(trainer=...)
+def decoded_trainer(frames):
+    from ultralytics.models.yolo.detect import DetectionTrainer
+
+    class DecodedTrainer(DetectionTrainer):
+        def build_dataset(self, img_path, mode='train', batch=None):
+            return frames.attach(super().build_dataset(img_path, mode, batch))
+    return DecodedTrainer
@@ -0,0 +1,95 @@
+import io
+import os
+import threading
+from collections import OrderedDict
+from PIL import Image
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# PNG zlib level for cached frames. A miss is encoded while the user waits: on 640x512
+# HIT-UAV frames level 1 takes ~18 ms and ~165 KB per frame, the PIL default 6 ~66 ms
+# and ~142 KB. The ~16% extra bytes cost a few cached frames; the 3.5x faster miss is
+# felt on every new image.
+DEFAULT_COMPRESS_LEVEL = 1
+
+
+# Process-wide cache of resized frames, shared by every session of the app.
+#
+# Frames are kept PNG-encoded (lossless, a fraction of the decoded size) and the
+# cache never holds more than max_bytes of them; the least recently used frame is
+# evicted first. get() returns a read-only memoryview over the stored bytes, so a
+# hit copies nothing. Entries are keyed by path, mtime and file size, so a replaced
+# image is re-read automatically. A caller that needs an exact size (e.g. a canvas
+# at a chosen zoom) passes it to get(); each size is cached as its own entry.
+class FrameCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_w=640, max_h=480, compress_level=DEFAULT_COMPRESS_LEVEL):
+        self.max_bytes = max_bytes
+        self.compress_level = compress_level
+        self.max_w = max_w
+        self.max_h = max_h
+        self._frames = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _key(self, image_path, size):
+        st = os.stat(image_path)
+        return (os.path.abspath(image_path), st.st_mtime_ns, st.st_size, size)
+
+    def _encode(self, image_path, size):
+        with Image.open(image_path) as image:
+            if size is None:
+                scale = min(self.max_w / image.width, self.max_h / image.height, 1.0)
+                width, height = int(image.width * scale), int(image.height * scale)
+            else:
+                width, height = size
+            # Let the JPEG decoder skip straight to a reduced scale when it can
+            image.draft(image.mode, (width, height))
+            image = image.resize((width, height))
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG', compress_level=self.compress_level)
+        return buffer.getvalue(), width, height
+
+    # (memoryview of PNG bytes, width, height) for the resized frame; size=(width, height)
+    # overrides the max_w/max_h fit
+    def get(self, image_path, size=None):
+        key = self._key(image_path, size)
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is not None:
+                self._frames.move_to_end(key)
+                self._hits += 1
+                return memoryview(entry[0]).toreadonly(), entry[1], entry[2]
+            self._misses += 1
+        # Encode outside the lock so other sessions are not held up
+        data, width, height = self._encode(image_path, size)
+        with self._lock:
+            if key not in self._frames:
+                self._frames[key] = (data, width, height)
+                self._bytes += len(data)
+                while self._bytes > self.max_bytes and len(self._frames) > 1:
+                    _, (old, _, _) = self._frames.popitem(last=False)
+                    self._bytes -= len(old)
+                    self._evictions += 1
+        return memoryview(data).toreadonly(), width, height
+
+    # The frame as a PIL image, e.g. for st_canvas
+    def get_image(self, image_path, size=None):
+        data, width, height = self.get(image_path, size)
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        return image, width, height
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'evictions': self._evictions,
+                'entries': len(self._frames),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes
+            }
@@ -0,0 +1,218 @@
+import os
+import json
+import shutil
+import hashlib
+import argparse
+import numpy as np
+import yaml
+
+INDEX_DIR = '.cache/label_index'
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# Per-image columns and per-box columns, each stored as its own .npy file
+IMAGE_COLUMNS = ('stems', 'mtimes', 'sizes', 'offsets')
+BOX_COLUMNS = ('image_id', 'cls', 'xywhn', 'area')
+
+
+def parse_label_file(label_path, dtype=np.float32):
+    rows = []
+    with open(label_path, 'r') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 5:
+                try:
+                    rows.append([float(v) for v in parts[:5]])
+                except ValueError:
+                    continue
+    return np.array(rows, dtype=dtype).reshape(-1, 5)
+
+
+# Columnar index over every YOLO label file in one directory.
+#
+# Each box is one row (image_id, cls, xywhn, area); per-image columns hold the
+# label file stem, mtime and size plus offsets into the box rows. Columns are
+# saved as separate .npy files under .cache/label_index and memory-mapped on
+# load, and rebuilding only re-parses label files whose mtime or size changed.
+class LabelIndex:
+    def __init__(self, labels_dir, columns, names=None):
+        self.labels_dir = labels_dir
+        self.names = list(names) if names is not None else None
+        for name, values in columns.items():
+            setattr(self, name, values)
+
+    @staticmethod
+    def store_dir(labels_dir):
+        key = hashlib.sha1(os.path.abspath(labels_dir).encode('utf-8')).hexdigest()[:12]
+        return os.path.join(INDEX_DIR, f"{os.path.basename(os.path.dirname(os.path.abspath(labels_dir)))}_{key}")
+
+    @classmethod
+    def _load_columns(cls, store):
+        if not os.path.exists(os.path.join(store, 'meta.json')):
+            return None
+        return {
+            name: np.load(os.path.join(store, name + '.npy'), mmap_mode='r')
+            for name in IMAGE_COLUMNS + BOX_COLUMNS
+        }
+
+    # Load the index for a label directory, refreshing entries for changed files
+    @classmethod
+    def build(cls, labels_dir, names=None):
+        store = cls.store_dir(labels_dir)
+        old = cls._load_columns(store)
+        old_rows = {}
+        if old is not None:
+            for i, stem in enumerate(old['stems']):
+                old_rows[str(stem)] = i
+
+        entries = []
+        with os.scandir(labels_dir) as it:
+            for entry in it:
+                if entry.name.endswith('.txt'):
+                    st = entry.stat()
+                    entries.append((entry.name[:-4], st.st_mtime_ns, st.st_size))
+        entries.sort()
+
+        # Fast path: nothing added, removed or touched since the last build
+        if old is not None and len(entries) == len(old['stems']):
+            stems, mtimes, sizes = zip(*entries) if entries else ((), (), ())
+            if (np.array_equal(np.array(stems, dtype=str), old['stems'])
+                    and np.array_equal(np.array(mtimes, dtype=np.int64), old['mtimes'])
+                    and np.array_equal(np.array(sizes, dtype=np.int64), old['sizes'])):
+                return cls(labels_dir, old, names)
+
+        stems, mtimes, sizes = [], [], []
+        box_parts, counts = [], []
+        for stem, mtime, size in entries:
+            i = old_rows.get(stem)
+            if i is not None and old['mtimes'][i] == mtime and old['sizes'][i] == size:
+                start, end = old['offsets'][i], old['offsets'][i + 1]
+                part = np.column_stack([old['cls'][start:end], old['xywhn'][start:end]])
+            else:
+                part = parse_label_file(os.path.join(labels_dir, stem + '.txt'))
+            stems.append(stem)
+            mtimes.append(mtime)
+            sizes.append(size)
+            box_parts.append(part)
+            counts.append(len(part))
+
+        boxes = np.concatenate(box_parts) if box_parts else np.zeros((0, 5), dtype=np.float32)
+        columns = {
+            'stems': np.array(stems, dtype=str),
+            'mtimes': np.array(mtimes, dtype=np.int64),
+            'sizes': np.array(sizes, dtype=np.int64),
+            'offsets': np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+            'image_id': np.repeat(np.arange(len(stems), dtype=np.int32), counts),
+            'cls': boxes[:, 0].astype(np.int16),
+            'xywhn': boxes[:, 1:5].astype(np.float32),
+            'area': (boxes[:, 3] * boxes[:, 4]).astype(np.float32)
+        }
+        cls._save(store, labels_dir, columns)
+        return cls(labels_dir, cls._load_columns(store), names)
+
+    @staticmethod
+    def _save(store, labels_dir, columns):
+        tmp = store + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name, values in columns.items():
+            np.save(os.path.join(tmp, name + '.npy'), values)
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump({'labels_dir': os.path.abspath(labels_dir)}, f)
+        # Directories cannot be replaced atomically over a non-empty target, so swap via .old
+        old = store + '.old'
+        shutil.rmtree(old, ignore_errors=True)
+        if os.path.exists(store):
+            os.replace(store, old)
+        os.replace(tmp, store)
+        shutil.rmtree(old, ignore_errors=True)
+
+    def __len__(self):
+        return len(self.cls)
+
+    @property
+    def num_images(self):
+        return len(self.stems)
+
+    def class_id(self, cls):
+        if isinstance(cls, str):
+            if self.names is None:
+                raise ValueError(f"Class '{cls}' given by name but the index has no class names")
+            return self.names.index(cls)
+        return int(cls)
+
+    # Boolean mask over box rows matching every given condition
+    def mask(self, cls=None, min_area=None, max_area=None, min_w=None, max_w=None, min_h=None, max_h=None):
+        m = np.ones(len(self.cls), dtype=bool)
+        if cls is not None:
+            classes = cls if isinstance(cls, (list, tuple, set)) else [cls]
+            m &= np.isin(self.cls, [self.class_id(c) for c in classes])
+        for value, column, op in (
+            (min_area, self.area, np.greater_equal), (max_area, self.area, np.less),
+            (min_w, self.xywhn[:, 2], np.greater_equal), (max_w, self.xywhn[:, 2], np.less),
+            (min_h, self.xywhn[:, 3], np.greater_equal), (max_h, self.xywhn[:, 3], np.less)
+        ):
+            if value is not None:
+                m &= op(column, value)
+        return m
+
+    # Stems of images with at least one box matching the conditions, e.g.
+    #   index.images_where(cls='Car', max_area=0.002)
+    def images_where(self, **conditions):
+        ids = np.unique(self.image_id[self.mask(**conditions)])
+        return [str(s) for s in self.stems[ids]]
+
+    def class_counts(self):
+        nc = len(self.names) if self.names else int(self.cls.max()) + 1 if len(self.cls) else 0
+        return np.bincount(self.cls, minlength=nc)
+
+    # (num_images, num_classes) box counts per image, handy for stratified sampling
+    def per_image_class_counts(self):
+        nc = len(self.class_counts())
+        counts = np.zeros((self.num_images, nc), dtype=np.int32)
+        np.add.at(counts, (self.image_id, self.cls), 1)
+        return counts
+
+    def boxes_for(self, stem):
+        i = int(np.searchsorted(self.stems, stem))
+        if i >= len(self.stems) or self.stems[i] != stem:
+            return np.zeros((0, 5), dtype=np.float32)
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return np.column_stack([self.cls[start:end], self.xywhn[start:end]])
+
+    # Image file for a label stem, assuming the usual images/ folder next to labels/
+    def image_path(self, stem):
+        images_dir = os.path.join(os.path.dirname(os.path.normpath(self.labels_dir)), 'images')
+        for ext in IMAGE_EXTS:
+            path = os.path.join(images_dir, stem + ext)
+            if os.path.exists(path):
+                return path
+        return os.path.join(images_dir, stem + '.jpg')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the columnar label index for a YOLO split.")
+    parser.add_argument('labels_dir', help="e.g. datasets/train/labels")
+    parser.add_argument('--data', default='subset.yaml', help="Dataset YAML providing class names")
+    parser.add_argument('--cls', help="Class name or id to filter on")
+    parser.add_argument('--min-area', type=float)
+    parser.add_argument('--max-area', type=float)
+    args = parser.parse_args()
+
+    names = None
+    if os.path.exists(args.data):
+        with open(args.data, 'r') as f:
+            names = yaml.safe_load(f).get('names')
+    index = LabelIndex.build(args.labels_dir, names)
+    print(f"{index.num_images} label files, {len(index)} boxes")
+    for name, count in zip(names or range(len(index.class_counts())), index.class_counts()):
+        print(f"  {name}: {count}")
+    if args.cls is not None or args.min_area is not None or args.max_area is not None:
+        cls = int(args.cls) if args.cls is not None and args.cls.isdigit() else args.cls
+        stems = index.images_where(cls=cls, min_area=args.min_area, max_area=args.max_area)
+        print(f"{len(stems)} matching image(s)")
+        for stem in stems:
+            print(index.image_path(stem))
+
+
+if __name__ == '__main__':
+    main()
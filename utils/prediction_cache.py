@@ -0,0 +1,255 @@
+import os
+import time
+import sqlite3
+import hashlib
+from contextlib import contextmanager
+import numpy as np
+
+PREDICTION_CACHE_PATH = '.cache/predictions.db'
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    key TEXT PRIMARY KEY,
+    height INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    boxes BLOB NOT NULL,
+    nbytes INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS predictions_by_use ON predictions(last_used);
+-- Content hashes of image files, so unchanged files are never re-read
+CREATE TABLE IF NOT EXISTS image_hashes (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha1 TEXT NOT NULL
+);
+"""
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+# Exported models can be folders (OpenVINO IR); those hash every file they contain
+def weights_digest(model_path):
+    if not os.path.isdir(model_path):
+        return file_digest(model_path)
+    sha = hashlib.sha1()
+    for root, dirs, files in os.walk(model_path):
+        dirs.sort()
+        for name in sorted(files):
+            sha.update(name.encode('utf-8'))
+            sha.update(file_digest(os.path.join(root, name)).encode('utf-8'))
+    return sha.hexdigest()
+
+
+# Detections of one image as a compact (N, 6) float32 array:
+# class, x, y, w, h (normalized centre format), confidence.
+class Detections:
+    def __init__(self, path, orig_shape, names, data):
+        self.path = path
+        self.orig_shape = orig_shape  # (height, width) like ultralytics Results
+        self.names = names
+        self.data = np.asarray(data, dtype=np.float32).reshape(-1, 6)
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def cls(self):
+        return self.data[:, 0]
+
+    @property
+    def xywhn(self):
+        return self.data[:, 1:5]
+
+    @property
+    def conf(self):
+        return self.data[:, 5]
+
+    # Absolute corner coordinates in pixels
+    @property
+    def xyxy(self):
+        h, w = self.orig_shape
+        x, y, bw, bh = self.xywhn.T
+        return np.stack([(x - bw / 2) * w, (y - bh / 2) * h, (x + bw / 2) * w, (y + bh / 2) * h], axis=1)
+
+    @classmethod
+    def from_result(cls, result):
+        if result.boxes is not None and len(result.boxes) > 0:
+            data = np.column_stack([
+                result.boxes.cls.cpu().numpy(),
+                result.boxes.xywhn.cpu().numpy(),
+                result.boxes.conf.cpu().numpy()
+            ])
+        else:
+            data = np.zeros((0, 6), dtype=np.float32)
+        return cls(result.path, tuple(result.orig_shape), result.names, data)
+
+
+# Local store of model predictions keyed by content, not by file name:
+#   (weights digest, image digest, imgsz, conf, iou)
+# so a rerun with the same weights and pixels skips the forward pass entirely, and a
+# retrained model or an edited image simply misses. Entries are a few dozen bytes
+# each; once the store grows past max_bytes the least recently used ones go first.
+class PredictionCache:
+    def __init__(self, path=PREDICTION_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._weights = {}
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def weights_digest(self, model_path):
+        st = os.stat(model_path)
+        memo_key = (os.path.abspath(model_path), st.st_mtime_ns, st.st_size)
+        if memo_key not in self._weights:
+            self._weights[memo_key] = weights_digest(model_path)
+        return self._weights[memo_key]
+
+    def image_digests(self, image_paths):
+        stats = {p: os.stat(p) for p in image_paths}
+        with self._connect() as conn:
+            known = {}
+            for p in image_paths:
+                row = conn.execute(
+                    "SELECT mtime_ns, size, sha1 FROM image_hashes WHERE path = ?", (os.path.abspath(p),)
+                ).fetchone()
+                if row and row['mtime_ns'] == stats[p].st_mtime_ns and row['size'] == stats[p].st_size:
+                    known[p] = row['sha1']
+            fresh = {p: file_digest(p) for p in image_paths if p not in known}
+            conn.executemany(
+                "INSERT OR REPLACE INTO image_hashes (path, mtime_ns, size, sha1) VALUES (?, ?, ?, ?)",
+                [(os.path.abspath(p), stats[p].st_mtime_ns, stats[p].st_size, d) for p, d in fresh.items()]
+            )
+        known.update(fresh)
+        return [known[p] for p in image_paths]
+
+    # variant distinguishes other ways of running the same model (e.g. sliced inference)
+    def keys(self, model_path, image_paths, imgsz, conf, iou, variant=''):
+        return self.digest_keys(model_path, self.image_digests(image_paths), imgsz, conf, iou, variant)
+
+    # Same keys from image digests known up front (e.g. recorded in a shard index)
+    def digest_keys(self, model_path, digests, imgsz, conf, iou, variant=''):
+        weights = self.weights_digest(model_path)
+        settings = f"{imgsz}|{conf}|{iou}" + (f"|{variant}" if variant else '')
+        return [hashlib.sha1(f"{weights}|{digest}|{settings}".encode('utf-8')).hexdigest() for digest in digests]
+
+    # {key: ((height, width), (N, 6) array)} for the keys that are cached
+    def get_many(self, keys):
+        found = {}
+        with self._connect() as conn:
+            for key in keys:
+                row = conn.execute("SELECT height, width, boxes FROM predictions WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    found[key] = ((row['height'], row['width']), np.frombuffer(row['boxes'], dtype=np.float32).reshape(-1, 6))
+            conn.executemany(
+                "UPDATE predictions SET last_used = ? WHERE key = ?", [(time.time(), k) for k in found]
+            )
+        return found
+
+    # entries: {key: ((height, width), (N, 6) array)}
+    def put_many(self, entries):
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO predictions (key, height, width, boxes, nbytes, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (key, int(shape[0]), int(shape[1]), data.astype(np.float32).tobytes(), data.nbytes, now)
+                    for key, (shape, data) in entries.items()
+                ]
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM predictions").fetchone()[0]
+        # Row overhead (key, shape, timestamps) counts too
+        total += 64 * conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed, doomed = 0, []
+        for row in conn.execute("SELECT key, nbytes FROM predictions ORDER BY last_used"):
+            if freed >= excess:
+                break
+            doomed.append((row['key'],))
+            freed += row['nbytes'] + 64
+        conn.executemany("DELETE FROM predictions WHERE key = ?", doomed)
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM predictions")
+
+
+# Drop-in for model.predict over a list of paths: yields one Detections per image, in
+# order, running the model only on cache misses, batch_size images per forward pass.
+# slicing: optional utils.sliced_inference.sliced_predict settings, e.g. {'tile': 320}
+# frames: optional utils.decoded_images.DecodedImages; images it holds at this imgsz are
+# fed to the model from memory instead of being decoded again. Their input differs
+# slightly from the decoded JPEG (resized ahead of time), so they are cached separately.
+def cached_predict(model, model_path, image_paths, cache=None, imgsz=640, conf=0.25, iou=0.7, batch_size=16,
+                   slicing=None, frames=None):
+    cache = cache or PredictionCache()
+    variant = ''
+    if slicing is not None:
+        variant = 'sliced:' + ','.join(f"{k}={v}" for k, v in sorted(slicing.items()))
+    use_frames = frames is not None and slicing is None and frames.imgsz == imgsz
+    for start in range(0, len(image_paths), batch_size):
+        batch = list(image_paths[start:start + batch_size])
+        stored = {p for p in batch if p in frames} if use_frames else set()
+        keys = [
+            cache.digest_keys(model_path, [digest], imgsz, conf, iou, 'decoded' if p in stored else variant)[0]
+            for p, digest in zip(batch, cache.image_digests(batch))
+        ]
+        found = cache.get_many(keys)
+        misses = [(p, k) for p, k in zip(batch, keys) if k not in found]
+        if misses:
+            fresh = {}
+            if slicing is not None:
+                from utils.sliced_inference import sliced_predict
+                results = sliced_predict(model, [p for p, _ in misses], imgsz=imgsz, conf=conf, iou=iou, **slicing)
+                for (path, key), detections in zip(misses, results):
+                    fresh[key] = (detections.orig_shape, detections.data)
+            else:
+                decoded = [(p, k) for p, k in misses if p in stored]
+                files = [(p, k) for p, k in misses if p not in stored]
+                if decoded:
+                    # Stored frames are resized by the same factor per axis as the original, so
+                    # normalized boxes carry over; only the original shape is restored
+                    results = model.predict(
+                        source=[frames.bgr(p) for p, _ in decoded], imgsz=imgsz, conf=conf, iou=iou, batch=batch_size,
+                        save=False, verbose=False
+                    )
+                    for (path, key), r in zip(decoded, results):
+                        fresh[key] = (frames.orig_shape(path), Detections.from_result(r).data)
+                if files:
+                    results = model.predict(
+                        source=[p for p, _ in files], imgsz=imgsz, conf=conf, iou=iou, batch=batch_size,
+                        save=False, stream=True, verbose=False
+                    )
+                    for (path, key), r in zip(files, results):
+                        detections = Detections.from_result(r)
+                        fresh[key] = (detections.orig_shape, detections.data)
+            cache.put_many(fresh)
+            found.update(fresh)
+        for path, key in zip(batch, keys):
+            shape, data = found[key]
+            yield Detections(path, shape, model.names, data)
@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Loads values for keys ahead of time in a small thread pool.
+#
+# warm(keys) queues loads for keys that are neither ready nor in flight and returns at
+# once; get(key) hands back the ready value, waits for an in-flight load, or loads on
+# the caller's thread as a last resort. At most max_items finished values are kept
+# (least recently used dropped first), so only the neighbourhood of what is being
+# looked at stays in memory.
+class Prefetcher:
+    def __init__(self, load, workers=2, max_items=32):
+        self.load = load
+        self.max_items = max_items
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='prefetch')
+        self._ready = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _store(self, key, future):
+        with self._lock:
+            # A key invalidated while loading has no pending entry left; drop its value
+            if self._pending.get(key) is not future:
+                return
+            del self._pending[key]
+            if future.exception() is not None:
+                return
+            self._ready[key] = future.result()
+            self._ready.move_to_end(key)
+            while len(self._ready) > self.max_items:
+                self._ready.popitem(last=False)
+
+    def warm(self, keys):
+        futures = []
+        with self._lock:
+            for key in keys:
+                if key in self._ready or key in self._pending:
+                    continue
+                future = self._executor.submit(self.load, key)
+                self._pending[key] = future
+                futures.append((key, future))
+        # Callbacks may run right away on this thread, so attach them outside the lock
+        for key, future in futures:
+            future.add_done_callback(lambda f, key=key: self._store(key, f))
+
+    def get(self, key):
+        with self._lock:
+            if key in self._ready:
+                self._ready.move_to_end(key)
+                return self._ready[key]
+            future = self._pending.get(key)
+        if future is not None:
+            return future.result()
+        value = self.load(key)
+        with self._lock:
+            self._ready[key] = value
+            while len(self._ready) > self.max_items:
+                self._ready.popitem(last=False)
+        return value
+
+    # Forget a key (e.g. after its labels were saved) so the next get reloads it
+    def invalidate(self, key):
+        with self._lock:
+            self._ready.pop(key, None)
+            self._pending.pop(key, None)
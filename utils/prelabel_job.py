@@ -0,0 +1,126 @@
+import os
+import sys
+import json
+import subprocess
+import datetime
+
+STATUS_FILE = '.prelabel_status.json'
+CANCEL_FILE = '.prelabel_cancel'
+PID_FILE = '.prelabel.pid'
+# A job still 'starting' without a known pid after this long never got launched
+STARTING_TIMEOUT = 30
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts', 'auto_label.py')
+
+
+# Bookkeeping for the background pre-labeling job of a project. The job itself runs
+# scripts/auto_label.py in its own process; the UI and the worker only share the
+# small status/cancel files in the project folder.
+
+def status_path(project_dir):
+    return os.path.join(project_dir, STATUS_FILE)
+
+
+def cancel_path(project_dir):
+    return os.path.join(project_dir, CANCEL_FILE)
+
+
+def pid_path(project_dir):
+    return os.path.join(project_dir, PID_FILE)
+
+
+def read_pid(project_dir):
+    try:
+        with open(pid_path(project_dir), 'r') as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def write_status(project_dir, **status):
+    status['updated_at'] = str(datetime.datetime.now())
+    path = status_path(project_dir)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(status, f)
+    os.replace(tmp_path, path)
+
+
+def read_status(project_dir):
+    path = status_path(project_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        status = json.load(f)
+    # A worker that died without reporting (import error, OOM kill) leaves a 'starting'
+    # or 'running' status behind
+    if status.get('state') in ('starting', 'running'):
+        pid = status.get('pid') or read_pid(project_dir)
+        if pid is None:
+            started = datetime.datetime.fromisoformat(status['updated_at'])
+            if (datetime.datetime.now() - started).total_seconds() > STARTING_TIMEOUT:
+                status['state'] = 'failed'
+                status.setdefault('error', 'Worker process was never started')
+        elif not pid_alive(pid):
+            status['state'] = 'failed'
+            status.setdefault('error', 'Worker process exited unexpectedly')
+    return status
+
+
+def pid_alive(pid):
+    if not pid:
+        return False
+    # The worker is a child of the Streamlit process; reap it if it has exited, since
+    # an unreaped (zombie) child still answers kill(pid, 0)
+    try:
+        reaped, _ = os.waitpid(pid, os.WNOHANG)
+        if reaped == pid:
+            return False
+    except ChildProcessError:
+        pass
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def is_running(project_dir):
+    status = read_status(project_dir)
+    return status is not None and status.get('state') in ('starting', 'running')
+
+
+def start_job(project_dir, model_path='model/baseline.pt', batch_size=16, conf=0.25):
+    if is_running(project_dir):
+        return False
+    for path in (cancel_path(project_dir), pid_path(project_dir)):
+        if os.path.exists(path):
+            os.remove(path)
+    # Status first: once the worker runs, its own writes must not be overwritten. The pid
+    # goes to a separate file for the same reason.
+    write_status(project_dir, state='starting', done=0, total=0)
+    log_path = os.path.join(project_dir, '.prelabel.log')
+    try:
+        with open(log_path, 'w') as log:
+            process = subprocess.Popen(
+                [sys.executable, WORKER_SCRIPT, '--project-dir', project_dir, '--model', model_path,
+                 '--batch-size', str(batch_size), '--conf', str(conf)],
+                stdout=log, stderr=subprocess.STDOUT,
+                start_new_session=True  # keep running independently of the Streamlit script thread
+            )
+    except OSError as e:
+        write_status(project_dir, state='failed', done=0, total=0, error=str(e))
+        return False
+    tmp_path = pid_path(project_dir) + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(str(process.pid))
+    os.replace(tmp_path, pid_path(project_dir))
+    return True
+
+
+# Ask the worker to stop after the current batch
+def cancel_job(project_dir):
+    open(cancel_path(project_dir), 'w').close()
+
+
+def cancel_requested(project_dir):
+    return os.path.exists(cancel_path(project_dir))
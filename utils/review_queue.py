@@ -0,0 +1,135 @@
+import os
+import json
+import sqlite3
+import datetime
+from contextlib import contextmanager
+import streamlit as st
+
+REVIEW_INDEX_PATH = 'annotations/review_index.db'
+# Marks were kept in this JSON file before; it is imported once and renamed
+LEGACY_INDEX_FILE = 'annotations/review_index.json'
+
+
+# Which flagged images have been reviewed, persisted as image path -> timestamp.
+# Each mark is its own row, so the apps (separate processes) never overwrite each
+# other's marks; reads work on a snapshot refreshed by count() and after each mark.
+class ReviewIndex:
+    def __init__(self, path=REVIEW_INDEX_PATH, legacy_path=LEGACY_INDEX_FILE):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS reviewed (path TEXT PRIMARY KEY, reviewed_at TEXT NOT NULL)")
+            if legacy_path and os.path.exists(legacy_path):
+                with open(legacy_path, 'r') as f:
+                    conn.executemany("INSERT OR IGNORE INTO reviewed (path, reviewed_at) VALUES (?, ?)", json.load(f).items())
+                os.replace(legacy_path, legacy_path + '.imported')
+        self.refresh()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # Pick up marks written by other processes
+    def refresh(self):
+        with self._connect() as conn:
+            self._reviewed = {path for (path,) in conn.execute("SELECT path FROM reviewed")}
+
+    def is_reviewed(self, image_path):
+        return image_path in self._reviewed
+
+    def count(self, image_paths):
+        self.refresh()
+        return sum(1 for p in image_paths if p in self._reviewed)
+
+    def mark(self, image_path, reviewed=True):
+        with self._connect() as conn:
+            if reviewed:
+                conn.execute(
+                    "INSERT OR REPLACE INTO reviewed (path, reviewed_at) VALUES (?, ?)",
+                    (image_path, str(datetime.datetime.now()))
+                )
+            else:
+                conn.execute("DELETE FROM reviewed WHERE path = ?", (image_path,))
+        self.refresh()
+
+
+# Index of the next (step=1) or previous (step=-1) unreviewed image, wrapping around
+def find_unreviewed(image_files, index, start, step=1):
+    n = len(image_files)
+    for offset in range(1, n + 1):
+        i = (start + step * offset) % n
+        if not index.is_reviewed(image_files[i]):
+            return i
+    return None
+
+
+# Windowed thumbnail list: only the current page of images is touched per rerun.
+# Returns the index the user picked this run, or None.
+def render_review_queue(image_files, index, thumbnails, per_page=10, grid=1, key='queue'):
+    n = len(image_files)
+    num_pages = (n - 1) // per_page + 1
+    page_key = f"{key}_page"
+    current_idx = st.session_state.get('current_idx', 0)
+    if page_key not in st.session_state:
+        st.session_state[page_key] = current_idx // per_page
+    st.session_state[page_key] = min(st.session_state[page_key], num_pages - 1)
+
+    reviewed = index.count(image_files)
+    st.progress(reviewed / n, text=f"Reviewed {reviewed} / {n}")
+
+    selected = None
+    searched = False
+    prev_col, next_col = st.columns(2)
+    with prev_col:
+        if st.button("⏮ Unreviewed", key=f"{key}_prev_unreviewed"):
+            searched = True
+            selected = find_unreviewed(image_files, index, current_idx, step=-1)
+    with next_col:
+        if st.button("Unreviewed ⏭", key=f"{key}_next_unreviewed"):
+            searched = True
+            selected = find_unreviewed(image_files, index, current_idx, step=1)
+    if searched and selected is None:
+        st.info("All images have been reviewed.")
+
+    jump_to = st.number_input("Go to image #", min_value=1, max_value=n, value=current_idx + 1, step=1, key=f"{key}_jump")
+    if st.button("Go", key=f"{key}_go"):
+        selected = int(jump_to) - 1
+
+    if selected is not None:
+        st.session_state[page_key] = selected // per_page
+        return selected
+
+    prev_page, next_page = st.columns(2)
+    with prev_page:
+        if st.button("⬅️ Prev", key=f"{key}_prev_page"):
+            st.session_state[page_key] = max(0, st.session_state[page_key] - 1)
+    with next_page:
+        if st.button("Next ➡️", key=f"{key}_next_page"):
+            st.session_state[page_key] = min(num_pages - 1, st.session_state[page_key] + 1)
+
+    start_idx = st.session_state[page_key] * per_page
+    end_idx = min(start_idx + per_page, n)
+    window = image_files[start_idx:end_idx]
+    # Build this page and the next one in the background, nothing else
+    thumbnails.warm(window + image_files[end_idx:end_idx + per_page])
+
+    cols = st.columns(grid)
+    for offset, img_path in enumerate(window):
+        i = start_idx + offset
+        with cols[offset % grid]:
+            try:
+                marker = "✅ " if index.is_reviewed(img_path) else ""
+                caption = f"{marker}{i+1}. {os.path.basename(img_path)}"
+                st.image(thumbnails.get(img_path), caption=caption, use_column_width=True)
+                if st.button(f"Select {i+1}", key=f"{key}_btn_{i}"):
+                    selected = i
+            except Exception as e:
+                st.error(f"Error loading image {img_path}: {str(e)}")
+    st.markdown(f"Page {st.session_state[page_key]+1} of {num_pages}")
+    return selected
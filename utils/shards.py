@@ -0,0 +1,269 @@
+import os
+import json
+import shutil
+import hashlib
+import cv2
+import numpy as np
+from PIL import Image
+
+from utils.label_index import IMAGE_EXTS, parse_label_file
+from utils.decoded_images import resize_for_imgsz, DecodedLoader
+from utils.prediction_cache import PredictionCache, Detections
+
+INDEX_FILE = 'index.json'
+SHARD_PATTERN = 'shard-{:05d}.bin'
+DEFAULT_SHARD_BYTES = 256 * 1024 * 1024
+# Index columns, one list per column so the file stays compact
+COLUMNS = ('name', 'shard', 'offset', 'image_nbytes', 'label_count', 'label_nbytes', 'height', 'width', 'sha1')
+# float64 so the parsed rows hold exactly the values written in the label files
+LABEL_DTYPE = np.float64
+LABEL_ROW_NBYTES = 5 * np.dtype(LABEL_DTYPE).itemsize
+
+
+def is_shard_dir(path):
+    return os.path.isfile(os.path.join(str(path), INDEX_FILE))
+
+
+# Pack a YOLO split (images/ + labels/) into a few large shard files.
+#
+# Each record is the encoded image file, byte for byte, followed by its labels as an
+# (N, 5) float64 array and then the label file itself, byte for byte, so unpack can
+# restore it exactly; index.json holds per record the shard, offset, sizes, image
+# shape and the image's sha1 (what the prediction cache keys on). label_count and
+# label_nbytes are -1 for an image without a label file. Lines that do not parse as
+# five numbers are left out of the array (see scripts/lint_dataset.py) but kept in
+# the file bytes. The pack is written next to out_dir and moved
+# into place when complete, so readers never see a half-written one.
+def pack_split(split_dir, out_dir, shard_bytes=DEFAULT_SHARD_BYTES):
+    images_dir = os.path.join(split_dir, 'images')
+    labels_dir = os.path.join(split_dir, 'labels')
+    names = sorted(f for f in os.listdir(images_dir) if f.lower().endswith(IMAGE_EXTS))
+    tmp_dir = out_dir.rstrip('/') + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns = {name: [] for name in COLUMNS}
+    shard, f = -1, None
+    try:
+        for name in names:
+            with open(os.path.join(images_dir, name), 'rb') as image_file:
+                data = image_file.read()
+            with Image.open(os.path.join(images_dir, name)) as image:
+                width, height = image.size
+            label_path = os.path.join(labels_dir, os.path.splitext(name)[0] + '.txt')
+            labels, label_file = None, None
+            if os.path.exists(label_path):
+                labels = parse_label_file(label_path, LABEL_DTYPE)
+                with open(label_path, 'rb') as txt:
+                    label_file = txt.read()
+
+            if f is None or (f.tell() > 0 and f.tell() + len(data) > shard_bytes):
+                if f is not None:
+                    f.close()
+                shard += 1
+                f = open(os.path.join(tmp_dir, SHARD_PATTERN.format(shard)), 'wb')
+            record = (name, shard, f.tell(), len(data), -1 if labels is None else len(labels),
+                      -1 if label_file is None else len(label_file), height, width, hashlib.sha1(data).hexdigest())
+            for column, value in zip(COLUMNS, record):
+                columns[column].append(value)
+            f.write(data)
+            if labels is not None:
+                f.write(labels.astype(LABEL_DTYPE).tobytes())
+                f.write(label_file)
+    finally:
+        if f is not None:
+            f.close()
+
+    with open(os.path.join(tmp_dir, INDEX_FILE), 'w') as index_file:
+        json.dump({'source': os.path.abspath(split_dir), 'shards': shard + 1, 'columns': columns}, index_file)
+    if os.path.exists(out_dir):
+        shutil.rmtree(out_dir)
+    os.replace(tmp_dir, out_dir)
+    return ShardReader(out_dir)
+
+
+# Reads a packed split either front to back (iter: one open per shard, large sequential
+# reads) or by record (read/imread: positioned reads on descriptors kept open). Records
+# are addressed by index or by their virtual path <shard_dir>/<image name>. Picklable,
+# so it can be used from DataLoader workers (descriptors are reopened there).
+class ShardReader:
+    def __init__(self, shard_dir):
+        self.shard_dir = shard_dir
+        with open(os.path.join(shard_dir, INDEX_FILE), 'r') as f:
+            index = json.load(f)
+        self.source = index['source']
+        self.num_shards = index['shards']
+        self.columns = index['columns']
+        self.names = self.columns['name']
+        self._position = {name: i for i, name in enumerate(self.names)}
+        self._fds = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_fds'] = {}
+        return state
+
+    def __del__(self):
+        for fd in getattr(self, '_fds', {}).values():
+            os.close(fd)
+
+    def path(self, i):
+        return os.path.join(self.shard_dir, self.names[i])
+
+    def position(self, path):
+        return self._position[os.path.basename(path)]
+
+    def _split(self, i, blob):
+        n = self.columns['image_nbytes'][i]
+        count = self.columns['label_count'][i]
+        if count < 0:
+            return self.names[i], blob[:n], None, None
+        end = n + count * LABEL_ROW_NBYTES
+        return self.names[i], blob[:n], np.frombuffer(blob[n:end], dtype=LABEL_DTYPE).reshape(count, 5), blob[end:]
+
+    def _record_nbytes(self, i):
+        return (self.columns['image_nbytes'][i] + max(self.columns['label_count'][i], 0) * LABEL_ROW_NBYTES
+                + max(self.columns['label_nbytes'][i], 0))
+
+    def _pread(self, i, nbytes, skip=0):
+        shard = self.columns['shard'][i]
+        fd = self._fds.get(shard)
+        if fd is None:
+            fd = self._fds[shard] = os.open(os.path.join(self.shard_dir, SHARD_PATTERN.format(shard)), os.O_RDONLY)
+        return os.pread(fd, nbytes, self.columns['offset'][i] + skip)
+
+    # (name, encoded image bytes, (N, 5) labels or None, label file bytes or None) for record i
+    def read(self, i):
+        return self._split(i, self._pread(i, self._record_nbytes(i)))
+
+    # Just the labels of record i, without reading the image
+    def labels(self, i):
+        count = self.columns['label_count'][i]
+        if count < 0:
+            return None
+        blob = self._pread(i, count * LABEL_ROW_NBYTES, skip=self.columns['image_nbytes'][i])
+        return np.frombuffer(blob, dtype=LABEL_DTYPE).reshape(count, 5)
+
+    # The original label file of record i, byte for byte, or None if it had none
+    def label_file(self, i):
+        if self.columns['label_count'][i] < 0:
+            return None
+        skip = self.columns['image_nbytes'][i] + self.columns['label_count'][i] * LABEL_ROW_NBYTES
+        return self._pread(i, self.columns['label_nbytes'][i], skip=skip)
+
+    # All records in order, streaming each shard file once
+    def __iter__(self):
+        i = 0
+        for shard in range(self.num_shards):
+            with open(os.path.join(self.shard_dir, SHARD_PATTERN.format(shard)), 'rb', buffering=8 * 1024 * 1024) as f:
+                while i < len(self.names) and self.columns['shard'][i] == shard:
+                    yield self._split(i, f.read(self._record_nbytes(i)))
+                    i += 1
+
+    # Decoded BGR image of record i (reads only the image bytes)
+    def decode(self, i):
+        data = self._pread(i, self.columns['image_nbytes'][i])
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    # BGR image for a virtual path, like cv2.imread
+    def imread(self, path):
+        return self.decode(self.position(path))
+
+    # DecodedLoader source: (BGR image resized for imgsz, original (h, w))
+    def load(self, path, imgsz):
+        image = self.imread(path)
+        return resize_for_imgsz(image, imgsz), image.shape[:2]
+
+    # Labels in the form ultralytics' YOLODataset.get_labels returns
+    def ultralytics_labels(self):
+        labels = []
+        for i in range(len(self.names)):
+            rows = self.labels(i)
+            rows = np.zeros((0, 5), dtype=np.float32) if rows is None else rows.astype(np.float32)
+            labels.append({
+                'im_file': self.path(i),
+                'shape': (self.columns['height'][i], self.columns['width'][i]),
+                'cls': rows[:, 0:1],
+                'bboxes': rows[:, 1:],
+                'segments': [],
+                'keypoints': None,
+                'normalized': True,
+                'bbox_format': 'xywh'
+            })
+        return labels
+
+
+# Restore the YOLO layout (images/ + labels/) from a pack; images and label files are
+# written back byte for byte
+def unpack_split(shard_dir, out_dir):
+    reader = ShardReader(shard_dir)
+    os.makedirs(os.path.join(out_dir, 'images'), exist_ok=True)
+    os.makedirs(os.path.join(out_dir, 'labels'), exist_ok=True)
+    for name, data, _, label_file in reader:
+        with open(os.path.join(out_dir, 'images', name), 'wb') as f:
+            f.write(data)
+        if label_file is not None:
+            with open(os.path.join(out_dir, 'labels', os.path.splitext(name)[0] + '.txt'), 'wb') as f:
+                f.write(label_file)
+    return len(reader)
+
+
+# cached_predict over a pack: keys come from the sha1s in the index, so cache hits read
+# nothing; misses are decoded from the shards in record order. Detections carry the
+# record's virtual path.
+def shard_predict(model, model_path, reader, cache=None, imgsz=640, conf=0.25, iou=0.7, batch_size=16, limit=None):
+    cache = cache or PredictionCache()
+    total = len(reader) if limit is None else min(limit, len(reader))
+    for start in range(0, total, batch_size):
+        batch = range(start, min(start + batch_size, total))
+        keys = cache.digest_keys(model_path, [reader.columns['sha1'][i] for i in batch], imgsz, conf, iou)
+        found = cache.get_many(keys)
+        misses = [(i, k) for i, k in zip(batch, keys) if k not in found]
+        if misses:
+            arrays = [reader.decode(i) for i, _ in misses]
+            results = model.predict(source=arrays, imgsz=imgsz, conf=conf, iou=iou, batch=batch_size, save=False, verbose=False)
+            fresh = {}
+            for (i, key), result in zip(misses, results):
+                detections = Detections.from_result(result)
+                fresh[key] = (detections.orig_shape, detections.data)
+            cache.put_many(fresh)
+            found.update(fresh)
+        for i, key in zip(batch, keys):
+            shape, data = found[key]
+            yield Detections(reader.path(i), shape, model.names, data)
+
+
+# Detection trainer class that also accepts shard directories as train/val paths in
+# the data YAML; loose-file splits are left to `base` (e.g. decoded_trainer(frames))
+def shard_trainer(base=None):
+    from ultralytics.data import build as data_build
+    from ultralytics.data.dataset import YOLODataset
+    from ultralytics.models.yolo.detect import DetectionTrainer
+    base = base or DetectionTrainer
+
+    # Images and labels come from the pack instead of a folder listing, label files and
+    # a labels.cache, and images are decoded straight from the shard bytes
+    class ShardDataset(YOLODataset):
+        def get_img_files(self, img_path):
+            self.shards = ShardReader(img_path)
+            self.load_image = DecodedLoader(self.shards, self.load_image, self)
+            return [self.shards.path(i) for i in range(len(self.shards))]
+
+        def get_labels(self):
+            return self.shards.ultralytics_labels()
+
+    class ShardTrainer(base):
+        def build_dataset(self, img_path, mode='train', batch=None):
+            if not is_shard_dir(img_path):
+                return super().build_dataset(img_path, mode, batch)
+            # build_yolo_dataset picks the dataset class from its module; swap it for this call
+            original = data_build.YOLODataset
+            data_build.YOLODataset = ShardDataset
+            try:
+                return super().build_dataset(img_path, mode, batch)
+            finally:
+                data_build.YOLODataset = original
+    return ShardTrainer
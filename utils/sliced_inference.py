@@ -0,0 +1,122 @@
+import cv2
+import numpy as np
+
+from utils.box_ops import box_iou
+from utils.prediction_cache import Detections
+
+
+# Top-left/bottom-right corners of overlapping tiles covering a (height, width) frame:
+# the fewest full-size tiles per axis that overlap by at least `overlap`, evenly spaced.
+def tile_grid(height, width, tile=320, overlap=0.2):
+    stride = max(1, int(tile * (1 - overlap)))
+
+    def starts(size):
+        if size <= tile:
+            return [0]
+        count = int(np.ceil((size - tile) / stride)) + 1
+        return np.linspace(0, size - tile, count).round().astype(int).tolist()
+
+    return np.array([
+        (x, y, min(x + tile, width), min(y + tile, height))
+        for y in starts(height) for x in starts(width)
+    ], dtype=np.int64).reshape(-1, 4)
+
+
+# Tiles with nothing warmer than the frame's background: in thermal frames people and
+# vehicles are bright, so a tile whose hottest pixel is close to the frame median has
+# nothing to find. Computed on one channel with a single max per tile.
+def hot_tiles(gray, tiles, hot_delta=40):
+    background = np.median(gray)
+    peaks = np.array([gray[y0:y1, x0:x1].max() for x0, y0, x1, y1 in tiles])
+    return peaks.astype(np.int32) - int(background) >= hot_delta
+
+
+# Greedy NMS that also records clusters: walking boxes by confidence, each box not yet
+# claimed keeps itself and claims every unclaimed same-class box overlapping it by more
+# than iou_thr. The IoU matrix is computed once, and the loop only runs once per kept box.
+# Returns, for every box, the index of the kept box whose cluster it belongs to.
+def cluster_boxes(xyxy, conf, cls, iou_thr=0.5):
+    order = np.argsort(-conf, kind='stable')
+    iou = box_iou(xyxy[order], xyxy[order])
+    overlaps = (iou > iou_thr) & (cls[order][:, None] == cls[order][None, :])
+    owner = np.full(len(order), -1)
+    for i in range(len(order)):
+        if owner[i] >= 0:
+            continue
+        claim = overlaps[i] & (owner < 0)
+        claim[i] = True
+        owner[claim] = i
+    result = np.empty(len(order), dtype=np.int64)
+    result[order] = order[owner]
+    return result
+
+
+# Merge boxes gathered from all tiles of one frame: (N, 6) rows of class, x1, y1, x2, y2, conf.
+#   'nms' keeps the best box of each cluster
+#   'wbf' replaces it with the confidence-weighted average of the cluster
+def merge_boxes(boxes, method='nms', iou_thr=0.5):
+    if len(boxes) == 0:
+        return boxes
+    cls, xyxy, conf = boxes[:, 0], boxes[:, 1:5], boxes[:, 5]
+    owner = cluster_boxes(xyxy, conf, cls, iou_thr)
+    heads = np.unique(owner)
+    if method == 'nms':
+        return boxes[heads]
+    index = np.searchsorted(heads, owner)
+    weights = np.zeros(len(heads))
+    coords = np.zeros((len(heads), 4))
+    np.add.at(weights, index, conf)
+    np.add.at(coords, index, xyxy * conf[:, None])
+    counts = np.bincount(index, minlength=len(heads))
+    conf_mean = weights / counts
+    return np.column_stack([cls[heads], coords / weights[:, None], conf_mean]).astype(np.float32)
+
+
+def _result_rows(result, offset=(0, 0)):
+    if result.boxes is None or len(result.boxes) == 0:
+        return np.zeros((0, 6), dtype=np.float32)
+    xyxy = result.boxes.xyxy.cpu().numpy() + np.array([offset[0], offset[1], offset[0], offset[1]])
+    return np.column_stack([result.boxes.cls.cpu().numpy(), xyxy, result.boxes.conf.cpu().numpy()])
+
+
+# Sliced inference over several frames at once. Every non-cold tile of every frame goes
+# through one batched predict call (chunked by tile_batch), plus one call for the full
+# frames so large objects that span tiles are still found. Boxes are merged per frame
+# across tiles and yielded as Detections in input order, so an unreadable image raises
+# rather than being skipped (callers zip the results with their inputs).
+def sliced_predict(model, image_paths, tile=320, overlap=0.2, imgsz=640, conf=0.25, iou=0.7,
+                   merge='nms', merge_iou=0.5, hot_delta=40, full_frame=True, tile_batch=32):
+    frames = []
+    for p in image_paths:
+        frame = cv2.imread(p)
+        if frame is None:
+            raise ValueError(f"Could not read image {p}")
+        frames.append(frame)
+    rows = [[] for _ in frames]
+    crops, owners = [], []
+    for i, frame in enumerate(frames):
+        height, width = frame.shape[:2]
+        tiles = tile_grid(height, width, tile, overlap)
+        for x0, y0, x1, y1 in tiles[hot_tiles(frame[..., 0], tiles, hot_delta)]:
+            crops.append(frame[y0:y1, x0:x1])
+            owners.append((i, (x0, y0)))
+
+    for start in range(0, len(crops), tile_batch):
+        results = model.predict(source=crops[start:start + tile_batch], imgsz=imgsz, conf=conf, iou=iou,
+                                save=False, verbose=False)
+        for (i, offset), result in zip(owners[start:start + tile_batch], results):
+            rows[i].append(_result_rows(result, offset))
+    if full_frame:
+        results = model.predict(source=frames, imgsz=imgsz, conf=conf, iou=iou, save=False, verbose=False)
+        for i, result in enumerate(results):
+            rows[i].append(_result_rows(result))
+
+    for path, frame, parts in zip(image_paths, frames, rows):
+        height, width = frame.shape[:2]
+        boxes = merge_boxes(np.concatenate(parts) if parts else np.zeros((0, 6), dtype=np.float32), merge, merge_iou)
+        x1, x2 = boxes[:, 1].clip(0, width), boxes[:, 3].clip(0, width)
+        y1, y2 = boxes[:, 2].clip(0, height), boxes[:, 4].clip(0, height)
+        data = np.column_stack([
+            boxes[:, 0], (x1 + x2) / 2 / width, (y1 + y2) / 2 / height, (x2 - x1) / width, (y2 - y1) / height, boxes[:, 5]
+        ])
+        yield Detections(path, (height, width), model.names, data)
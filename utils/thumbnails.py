@@ -0,0 +1,74 @@
+import os
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+THUMBNAIL_DIR = '.cache/thumbnails'
+
+
+# On-disk thumbnail store shared by the review apps.
+#
+# Thumbnails are small JPEGs keyed by (image path, mtime, file size, thumbnail
+# size), so an edited or replaced frame gets a fresh entry automatically. The
+# apps hand the cached file path straight to st.image, which means the
+# full-size frame is only ever decoded once, by a background worker.
+class ThumbnailCache:
+    def __init__(self, size=180, cache_dir=THUMBNAIL_DIR, workers=4, quality=85):
+        self.size = size
+        self.cache_dir = cache_dir
+        self.quality = quality
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='thumbs')
+        self._pending = {}
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _thumb_path(self, image_path):
+        st = os.stat(image_path)
+        key = f"{os.path.abspath(image_path)}|{st.st_mtime_ns}|{st.st_size}|{self.size}"
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest + '.jpg')
+
+    def _build(self, image_path, thumb_path):
+        with Image.open(image_path) as img:
+            # Let the JPEG decoder skip straight to a reduced scale
+            img.draft(img.mode, (self.size, self.size))
+            img.thumbnail((self.size, self.size))
+            if img.mode not in ('L', 'RGB'):
+                img = img.convert('RGB')
+            os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+            tmp_path = f"{thumb_path}.{threading.get_ident()}.tmp"
+            img.save(tmp_path, 'JPEG', quality=self.quality)
+        os.replace(tmp_path, thumb_path)
+        return thumb_path
+
+    def _submit(self, image_path, thumb_path):
+        with self._lock:
+            future = self._pending.get(thumb_path)
+            if future is not None:
+                return future
+            future = self._executor.submit(self._build, image_path, thumb_path)
+            self._pending[thumb_path] = future
+        future.add_done_callback(lambda _: self._forget(thumb_path))
+        return future
+
+    def _forget(self, thumb_path):
+        with self._lock:
+            self._pending.pop(thumb_path, None)
+
+    # Queue thumbnails for every missing image without blocking the caller
+    def warm(self, image_paths):
+        for image_path in image_paths:
+            try:
+                thumb_path = self._thumb_path(image_path)
+            except OSError:
+                continue
+            if not os.path.exists(thumb_path):
+                self._submit(image_path, thumb_path)
+
+    # Path of the cached thumbnail, waiting on (or doing) the build if needed
+    def get(self, image_path):
+        thumb_path = self._thumb_path(image_path)
+        if os.path.exists(thumb_path):
+            return thumb_path
+        return self._submit(image_path, thumb_path).result()
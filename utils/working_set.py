@@ -0,0 +1,114 @@
+import time
+import uuid
+from collections import OrderedDict
+
+# Normalized coordinates closer than this count as unchanged (the canvas rounds its JSON)
+BBOX_TOLERANCE = 5e-4
+
+
+# Boxes get an id for as long as they are edited, so labels and widgets follow the box
+# rather than its position in the list; ids are not stored
+def new_box_id():
+    return uuid.uuid4().hex[:12]
+
+
+def strip_boxes(boxes):
+    return [{'id': b.get('id') or new_box_id(), 'label': b['label'], 'bbox': [float(v) for v in b['bbox']]} for b in boxes]
+
+
+# Boxes in the form the store saves (without ids)
+def saved_form(boxes):
+    return [{'label': b['label'], 'bbox': b['bbox']} for b in boxes]
+
+
+def same_boxes(a, b, tol=BBOX_TOLERANCE):
+    return len(a) == len(b) and all(
+        x['label'] == y['label'] and all(abs(u - v) <= tol for u, v in zip(x['bbox'], y['bbox']))
+        for x, y in zip(a, b)
+    )
+
+
+# The boxes of the images a session is working on, kept in place of the canvas JSON.
+#
+# Entries hold geometry and labels only ({'id': str, 'label': str, 'bbox': [x, y, w, h]}, normalized)
+# for at most max_items images, least recently used evicted first. An edit marks its
+# entry dirty; flush() hands the dirty entries whose last edit is at least `delay`
+# seconds old to save({image: boxes}) in one call, so a burst of drags becomes a single
+# write. A dirty entry is saved before it is evicted, so nothing is dropped unsaved.
+# get() takes the store's current revision of the image: a clean entry loaded at an
+# older revision (another process saved the image since) is reloaded, while unsaved
+# edits are kept and win on the next save.
+class WorkingSet:
+    def __init__(self, save, max_items=8, delay=3.0):
+        self.save = save
+        self.max_items = max_items
+        self.delay = delay
+        self._entries = OrderedDict()
+        self._loads = 0
+        self.last_saved_at = None
+
+    def __contains__(self, image):
+        return image in self._entries
+
+    # Boxes for an image, loading the stored ones with load() on first use or when the
+    # stored revision moved past a clean entry
+    def get(self, image, load, revision=None):
+        entry = self._entries.get(image)
+        if entry is not None and entry['revision'] is None:
+            # Saved by this working set since; the next revision seen is that save's
+            entry['revision'] = revision
+        stale = (
+            entry is not None and revision is not None
+            and entry['edited_at'] is None and entry['revision'] != revision
+        )
+        if entry is None or stale:
+            boxes = strip_boxes(load())
+            self._loads += 1
+            entry = self._entries[image] = {
+                'boxes': boxes, 'saved': boxes, 'edited_at': None, 'revision': revision, 'generation': self._loads
+            }
+            self._evict()
+        self._entries.move_to_end(image)
+        return entry['boxes']
+
+    # Changes whenever the image's boxes are (re)loaded rather than edited
+    def generation(self, image):
+        return self._entries[image]['generation']
+
+    def update(self, image, boxes):
+        entry = self._entries[image]
+        boxes = strip_boxes(boxes)
+        if same_boxes(boxes, entry['boxes']):
+            return
+        entry['boxes'] = boxes
+        # Undoing an edit back to the saved state leaves nothing to save
+        entry['edited_at'] = None if same_boxes(boxes, entry['saved']) else time.monotonic()
+
+    def dirty(self):
+        return [image for image, entry in self._entries.items() if entry['edited_at'] is not None]
+
+    # Save dirty entries that have been idle for `delay` seconds (all of them, or only
+    # `images`, with force=True). Returns the saved image names.
+    def flush(self, force=False, images=None):
+        cutoff = time.monotonic() - self.delay
+        pending = {
+            image: entry['boxes'] for image, entry in self._entries.items()
+            if entry['edited_at'] is not None
+            and (images is None or image in images)
+            and (force or entry['edited_at'] <= cutoff)
+        }
+        if pending:
+            self.save(pending)
+            for image in pending:
+                entry = self._entries[image]
+                entry['saved'], entry['edited_at'], entry['revision'] = entry['boxes'], None, None
+            self.last_saved_at = time.time()
+        return list(pending)
+
+    def _evict(self):
+        while len(self._entries) > self.max_items:
+            image, entry = next(iter(self._entries.items()))
+            if entry['edited_at'] is not None:
+                self.save({image: entry['boxes']})
+                self.last_saved_at = time.time()
+            del self._entries[image]
@@ -0,0 +1,143 @@
+import os
+import json
+import hashlib
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+SUPPORTED_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+CHUNK_SIZE = 1024 * 1024
+HASH_MANIFEST = '.image_hashes.json'
+# Where the manifest used to live, inside images/ itself
+LEGACY_MANIFEST = '.hashes.json'
+
+
+def hash_file(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+# The manifest sits in the project folder (next to annotations.db), not in images/,
+# so nothing that lists or copies the images picks it up
+def manifest_path(images_dir):
+    return os.path.join(os.path.dirname(os.path.abspath(images_dir)), HASH_MANIFEST)
+
+
+# {sha256: filename} for everything already in the images folder. Kept on disk so
+# re-imports don't need to re-hash the whole project.
+def load_hashes(images_dir):
+    hashes = {}
+    for manifest in (os.path.join(images_dir, LEGACY_MANIFEST), manifest_path(images_dir)):
+        if os.path.exists(manifest):
+            with open(manifest, 'r') as f:
+                hashes.update(json.load(f))
+    known = set(hashes.values())
+    for name in os.listdir(images_dir):
+        if name.lower().endswith(SUPPORTED_EXTS) and name not in known:
+            hashes[hash_file(os.path.join(images_dir, name))] = name
+    # Drop entries for images deleted since the last import
+    return {h: n for h, n in hashes.items() if os.path.exists(os.path.join(images_dir, n))}
+
+
+def save_hashes(images_dir, hashes):
+    manifest = manifest_path(images_dir)
+    tmp_path = manifest + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(hashes, f)
+    os.replace(tmp_path, manifest)
+    legacy = os.path.join(images_dir, LEGACY_MANIFEST)
+    if os.path.exists(legacy):
+        os.remove(legacy)
+
+
+def unique_name(images_dir, filename):
+    stem, ext = os.path.splitext(filename)
+    candidate, n = filename, 1
+    while os.path.exists(os.path.join(images_dir, candidate)):
+        candidate = f"{stem}_{n}{ext}"
+        n += 1
+    return candidate
+
+
+# Open the header and check the file structure without decoding pixels.
+# Returns ((width, height), None) or (None, error message).
+def verify_image(path):
+    try:
+        with Image.open(path) as img:
+            size = img.size
+            img.verify()
+        return size, None
+    except Exception as e:
+        return None, str(e)
+
+
+def is_image_member(info):
+    filename = os.path.basename(info.filename)
+    # Skip folders, macOS resource forks (__MACOSX/, ._name) and other hidden files
+    return (
+        not info.is_dir()
+        and filename
+        and not filename.startswith('.')
+        and '__MACOSX' not in info.filename
+        and filename.lower().endswith(SUPPORTED_EXTS)
+    )
+
+
+# Copy every image in a zip (path or seekable file object) into images_dir in chunks,
+# hashing on the fly. Byte-identical images are skipped, basename collisions renamed,
+# and files whose header fails verification are removed again.
+#   progress(done, total, filename) is called after each member.
+# summary['imported'] holds {filename, sha256, width, height} for every new image.
+def import_zip(zip_source, images_dir, progress=None, workers=4):
+    os.makedirs(images_dir, exist_ok=True)
+    hashes = load_hashes(images_dir)
+    summary = {'imported': [], 'duplicates': [], 'renamed': [], 'invalid': []}
+
+    with zipfile.ZipFile(zip_source) as z, ThreadPoolExecutor(max_workers=workers) as pool:
+        members = [info for info in z.infolist() if is_image_member(info)]
+        checks = []
+        for done, info in enumerate(members, start=1):
+            filename = os.path.basename(info.filename)
+            tmp_path = os.path.join(images_dir, f".importing-{done}.part")
+            sha = hashlib.sha256()
+            with z.open(info) as source, open(tmp_path, 'wb') as target:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                    sha.update(chunk)
+                    target.write(chunk)
+            digest = sha.hexdigest()
+
+            if digest in hashes:
+                os.remove(tmp_path)
+                summary['duplicates'].append((info.filename, hashes[digest]))
+            else:
+                final_name = unique_name(images_dir, filename)
+                if final_name != filename:
+                    summary['renamed'].append((info.filename, final_name))
+                final_path = os.path.join(images_dir, final_name)
+                os.replace(tmp_path, final_path)
+                hashes[digest] = final_name
+                checks.append((digest, final_name, pool.submit(verify_image, final_path)))
+
+            if progress:
+                progress(done, len(members), filename)
+
+        for digest, final_name, future in checks:
+            size, error = future.result()
+            if error:
+                os.remove(os.path.join(images_dir, final_name))
+                hashes.pop(digest, None)
+                summary['invalid'].append((final_name, error))
+            else:
+                summary['imported'].append({
+                    'filename': final_name,
+                    'sha256': digest,
+                    'width': size[0],
+                    'height': size[1]
+                })
+
+    save_hashes(images_dir, hashes)
+    summary['total'] = len(members)
+    return summary